@@ -42,6 +42,10 @@ setup(
     packages=list(find_packages("src")),
     package_dir={"": "src"},
     install_requires=read_requirements("requirements.txt"),
+    extras_require={
+        "hiredis": ["hiredis>=1.0"],
+        "msgspec": ["msgspec>=0.18"],
+    },
     include_package_data=True,
     license="MIT",
     keywords="scrapy-redis",
@@ -1,3 +1,4 @@
+import redis
 from scrapy.utils.misc import load_object
 
 from . import defaults
@@ -13,8 +14,11 @@ SETTINGS_PARAMS_MAP = {
 
 SETTINGS_PARAMS_MAP["REDIS_DECODE_RESPONSES"] = "decode_responses"
 
+# Connection pools shared by the clients created with identical parameters.
+_connection_pools = {}
 
-def get_redis_from_settings(settings):
+
+def get_redis_from_settings(settings, **overrides):
     """Returns a redis client instance from given Scrapy settings object.
 
     This function uses ``get_client`` to instantiate the client and uses
@@ -25,6 +29,8 @@ def get_redis_from_settings(settings):
     ----------
     settings : Settings
         A scrapy settings object. See the supported settings below.
+    **overrides
+        Client parameters taking precedence over the settings.
 
     Returns
     -------
@@ -43,6 +49,11 @@ def get_redis_from_settings(settings):
         Server database
     REDIS_ENCODING : str, optional
         Data encoding.
+    REDIS_POOL_SIZE : int, optional
+        Maximum number of connections of the pool, overrides the
+        ``max_connections`` parameter.
+    REDIS_SOCKET_TIMEOUT : float, optional
+        Socket timeout in seconds, overrides the ``socket_timeout`` parameter.
     REDIS_PARAMS : dict, optional
         Additional client parameters.
 
@@ -59,6 +70,11 @@ def get_redis_from_settings(settings):
         val = settings.get(source)
         if val:
             params[dest] = val
+    if settings.get("REDIS_POOL_SIZE"):
+        params["max_connections"] = settings.getint("REDIS_POOL_SIZE")
+    if settings.get("REDIS_SOCKET_TIMEOUT"):
+        params["socket_timeout"] = settings.getfloat("REDIS_SOCKET_TIMEOUT")
+    params.update(overrides)
 
     # Allow ``redis_cls`` to be a path to a class.
     if isinstance(params.get("redis_cls"), str):
@@ -74,6 +90,13 @@ from_settings = get_redis_from_settings
 def get_redis(**kwargs):
     """Returns a redis client instance.
 
+    Clients of ``redis.Redis`` subclasses created with the same parameters
+    share one connection pool, so the scheduler, dupefilter, pipeline and
+    stats collector of a process reuse the same sockets. When
+    ``max_connections`` is given the pool is a ``BlockingConnectionPool``:
+    callers wait for a free connection instead of failing once the limit is
+    reached.
+
     Parameters
     ----------
     redis_cls : class, optional
@@ -92,6 +115,37 @@ def get_redis(**kwargs):
     redis_cls = kwargs.pop("redis_cls", defaults.REDIS_CLS)
     url = kwargs.pop("url", None)
     if url:
-        return redis_cls.from_url(url, **kwargs)
+        server = redis_cls.from_url(url, **kwargs)
     else:
-        return redis_cls(**kwargs)
+        server = redis_cls(**kwargs)
+    if (
+        isinstance(redis_cls, type)
+        and issubclass(redis_cls, redis.Redis)
+        and "connection_pool" not in kwargs
+    ):
+        server = _share_connection_pool(server, redis_cls, url, kwargs)
+    return server
+
+
+def _share_connection_pool(server, redis_cls, url, kwargs):
+    """Returns a client using the pool shared by clients with the same params."""
+    try:
+        pool_key = (redis_cls, url, frozenset(kwargs.items()))
+        pool = _connection_pools.get(pool_key)
+    except TypeError:
+        # Unhashable parameters, keep the client's own pool.
+        return server
+    if pool is None:
+        pool = server.connection_pool
+        if kwargs.get("max_connections"):
+            pool = redis.BlockingConnectionPool(
+                max_connections=pool.max_connections,
+                connection_class=pool.connection_class,
+                **pool.connection_kwargs
+            )
+        else:
+            # The shared pool outlives the client that created it.
+            server.auto_close_connection_pool = False
+        pool = _connection_pools.setdefault(pool_key, pool)
+    # Given an explicit pool, the returned client never closes it.
+    return redis_cls(connection_pool=pool)
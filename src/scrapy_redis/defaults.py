@@ -4,8 +4,13 @@ import redis
 DUPEFILTER_KEY = "dupefilter:%(timestamp)s"
 
 PIPELINE_KEY = "%(spider)s:items"
+PIPELINE_BATCH_SIZE = 100
+PIPELINE_FLUSH_INTERVAL = 1.0
 
 STATS_KEY = "%(spider)s:stats"
+STATS_COUNTERS_FLUSH_INTERVAL = 2.0
+STATS_FLUSH_INTERVAL = 1.0
+STATS_FLUSH_SIZE = 100
 
 # Job-scoped key templates (new, job-aware)
 JOB_SCOPED_PIPELINE_KEY = "%(job_id)s:%(spider)s:items"
@@ -22,6 +27,9 @@ REDIS_PARAMS = {
     "socket_connect_timeout": 30,
     "retry_on_timeout": True,
     "encoding": REDIS_ENCODING,
+    "max_connections": 64,
+    "health_check_interval": 30,
+    "socket_keepalive": True,
 }
 REDIS_CONCURRENT_REQUESTS = 16
 
@@ -30,6 +38,7 @@ SCHEDULER_QUEUE_CLASS = "scrapy_redis.queue.PriorityQueue"
 SCHEDULER_DUPEFILTER_KEY = "%(spider)s:dupefilter"
 SCHEDULER_DUPEFILTER_CLASS = "scrapy_redis.dupefilter.RedisDupeFilter"
 SCHEDULER_PERSIST = False
+SCHEDULER_PREFETCH = 32
 START_URLS_KEY = "%(name)s:start_urls"
 START_URLS_AS_SET = False
 START_URLS_AS_ZSET = False
@@ -37,14 +46,16 @@ MAX_IDLE_TIME = 0
 
 # Feature flags and new settings
 USE_JOB_SCOPED_KEYS = False
-SCHEDULER_SERIALIZER = "json"  # "json", "msgpack", or "picklecompat" for legacy
+SCHEDULER_SERIALIZER = "msgpack"  # "msgpack", "json", or "picklecompat" for legacy
+SCHEDULER_SERIALIZER_FORCE_LEGACY = False  # Keep JSON as default serializer
 PRIORITY_BLOCKING_ENABLED = "auto"  # auto|on|off
 REQUEST_LEASE_SECONDS = 120
 REQUEST_MAX_RETRIES = 5
-DUPEFILTER_TTL_SECONDS = 604800  # 7 days
+DUPEFILTER_TTL_SECONDS = 0  # Seconds, sliding on new fingerprints; 0 never expires
 RETRY_SIMPLE_ENABLED = True
 RETRY_SIMPLE_MAX = 3
 RETRY_PRIORITY_ADJUST = -10  # Lower priority for retries
 RETRY_HTTP_CODES = [500, 502, 503, 504, 408, 429]
 PROMETHEUS_ENABLED = False
 PROMETHEUS_PORT = 8000
+PROMETHEUS_SCAN_COUNT = 1000  # SCAN COUNT hint and HGETALL batch size
@@ -15,6 +15,16 @@ from .utils import get_effective_key
 
 logger = logging.getLogger(__name__)
 
+# Adds a fingerprint and, only when it is new, refreshes the key TTL. Doing both
+# in one script never leaves the key without expiry.
+ADD_FINGERPRINT_SCRIPT = """
+local added = redis.call('SADD', KEYS[1], ARGV[1])
+if added == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return added
+"""
+
 
 class RedisDupeFilter(BaseDupeFilter):
     """Redis-based request duplicates filter.
@@ -25,7 +35,7 @@ class RedisDupeFilter(BaseDupeFilter):
 
     logger = logger
 
-    def __init__(self, server, key, debug=False):
+    def __init__(self, server, key, debug=False, ttl=None):
         """Initialize the duplicates filter.
 
         Parameters
@@ -36,12 +46,19 @@ class RedisDupeFilter(BaseDupeFilter):
             Redis key Where to store fingerprints.
         debug : bool, optional
             Whether to log filtered requests.
+        ttl : int, optional
+            Seconds the fingerprints key lives after the last new fingerprint.
+            No expiry if not given.
 
         """
         self.server = server
         self.key = key
         self.debug = debug
+        self.ttl = ttl
         self.logdupes = True
+        self._add_script = None
+        if ttl:
+            self._add_script = server.register_script(ADD_FINGERPRINT_SCRIPT)
 
     @classmethod
     def from_settings(cls, settings):
@@ -70,7 +87,8 @@ class RedisDupeFilter(BaseDupeFilter):
         job_id = os.environ.get('SCRAPY_JOB', int(time.time()))
         key = defaults.DUPEFILTER_KEY % {"timestamp": job_id}
         debug = settings.getbool("DUPEFILTER_DEBUG")
-        return cls(server, key=key, debug=debug)
+        ttl = settings.getint("DUPEFILTER_TTL_SECONDS", defaults.DUPEFILTER_TTL_SECONDS)
+        return cls(server, key=key, debug=debug, ttl=ttl)
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -102,9 +120,17 @@ class RedisDupeFilter(BaseDupeFilter):
         """
         fp = self.request_fingerprint(request)
         # This returns the number of values added, zero if already exists.
-        added = self.server.sadd(self.key, fp)
+        if self._add_script is not None:
+            added = self._add_script(keys=[self.key], args=[fp, self.ttl_ms])
+        else:
+            added = self.server.sadd(self.key, fp)
         return added == 0
 
+    @property
+    def ttl_ms(self):
+        """Fingerprints key TTL in milliseconds, zero if it never expires."""
+        return int(self.ttl * 1000) if self.ttl else 0
+
     def request_fingerprint(self, request):
         """Returns a fingerprint for a given request.
 
@@ -140,7 +166,8 @@ class RedisDupeFilter(BaseDupeFilter):
             spider.name
         )
         debug = settings.getbool("DUPEFILTER_DEBUG")
-        return cls(server, key=effective_key, debug=debug)
+        ttl = settings.getint("DUPEFILTER_TTL_SECONDS", defaults.DUPEFILTER_TTL_SECONDS)
+        return cls(server, key=effective_key, debug=debug, ttl=ttl)
 
     def close(self, reason=""):
         """Delete data on close. Called by Scrapy's scheduler.
@@ -1,27 +1,84 @@
+import logging
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+from scrapy.utils.log import failure_to_exc_info
 from scrapy.utils.misc import load_object
 from scrapy.utils.serialize import ScrapyJSONEncoder
+from twisted.internet import defer, task
 from twisted.internet.threads import deferToThread
 
 from . import connection, defaults
-from .utils import get_effective_key
+from .utils import build_key_resolver
+
+logger = logging.getLogger(__name__)
+
+_scrapy_encoder = ScrapyJSONEncoder()
+
+default_serialize = _scrapy_encoder.encode
 
-default_serialize = ScrapyJSONEncoder().encode
+
+def orjson_serialize(item):
+    """Serialize ``item`` to JSON ``bytes`` with orjson.
+
+    Opt in with ``REDIS_ITEMS_SERIALIZER =
+    "scrapy_redis.pipelines.orjson_serialize"``. Types orjson does not
+    handle natively go through ``ScrapyJSONEncoder.default``. Unlike
+    ``default_serialize``, NaN and infinities are written as ``null``.
+
+    """
+    if not HAS_ORJSON:
+        raise ImportError("orjson_serialize requires the orjson package")
+    try:
+        return orjson.dumps(
+            item,
+            default=_scrapy_encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    except TypeError:
+        # E.g. integers over 64 bits, which Scrapy's encoder accepts.
+        return _scrapy_encoder.encode(item).encode()
 
 
 class RedisPipeline:
     """Pushes serialized item into a redis list/queue
 
+    Items are buffered per key and written with a single variadic ``RPUSH``
+    once ``batch_size`` items are pending or every ``flush_interval`` seconds,
+    whichever comes first. Remaining items are flushed when the spider closes.
+    Items are serialized as soon as they are buffered. Pushes to the same key
+    run one after the other; a batch that fails to be pushed is logged and
+    kept for the next flush.
+
     Settings
     --------
     REDIS_ITEMS_KEY : str
         Redis key where to store items.
     REDIS_ITEMS_SERIALIZER : str
-        Object path to serializer function.
+        Object path to serializer function. Use
+        ``scrapy_redis.pipelines.orjson_serialize`` for faster encoding when
+        orjson is installed.
+    REDIS_ITEMS_BATCH_SIZE : int (default: 100)
+        Number of buffered items that triggers a flush. Use 1 to push every
+        item as soon as it is processed.
+    REDIS_ITEMS_FLUSH_INTERVAL : float (default: 1.0)
+        Seconds between periodic flushes of partially filled buffers. Use 0 to
+        disable periodic flushing.
 
     """
 
     def __init__(
-        self, server, key=defaults.PIPELINE_KEY, serialize_func=default_serialize, settings=None
+        self,
+        server,
+        key=defaults.PIPELINE_KEY,
+        serialize_func=default_serialize,
+        settings=None,
+        batch_size=defaults.PIPELINE_BATCH_SIZE,
+        flush_interval=defaults.PIPELINE_FLUSH_INTERVAL,
     ):
         """Initialize pipeline.
 
@@ -35,18 +92,43 @@ class RedisPipeline:
             Items serializer function.
         settings : scrapy.settings.Settings, optional
             Settings for job-scoped key support
+        batch_size : int
+            Number of buffered items per key that triggers a flush.
+        flush_interval : float
+            Seconds between periodic flushes. Zero disables them.
 
         """
+        if batch_size < 1:
+            raise ValueError("batch_size must be greater than zero")
+
         self.server = server
         self.key = key
         self.serialize = serialize_func
         self.settings = settings
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Pending items, one list per redis key to keep ordering.
+        self._buffers = {}
+        # Serializes the pushes of each key.
+        self._push_locks = {}
+        self._flush_task = None
+        self._resolve_key = None
+        if settings:
+            self._resolve_key = build_key_resolver(
+                settings, key, defaults.JOB_SCOPED_PIPELINE_KEY
+            )
 
     @classmethod
     def from_settings(cls, settings):
         params = {
             "server": connection.from_settings(settings),
             "settings": settings,
+            "batch_size": settings.getint(
+                "REDIS_ITEMS_BATCH_SIZE", defaults.PIPELINE_BATCH_SIZE
+            ),
+            "flush_interval": settings.getfloat(
+                "REDIS_ITEMS_FLUSH_INTERVAL", defaults.PIPELINE_FLUSH_INTERVAL
+            ),
         }
         if settings.get("REDIS_ITEMS_KEY"):
             params["key"] = settings["REDIS_ITEMS_KEY"]
@@ -59,14 +141,86 @@ class RedisPipeline:
     def from_crawler(cls, crawler):
         return cls.from_settings(crawler.settings)
 
-    def process_item(self, item, spider):
-        return deferToThread(self._process_item, item, spider)
+    def open_spider(self, spider):
+        if self.flush_interval > 0 and self.batch_size > 1:
+            self._flush_task = task.LoopingCall(self.flush)
+            self._flush_task.start(self.flush_interval, now=False)
+
+    def close_spider(self, spider):
+        if self._flush_task is not None and self._flush_task.running:
+            self._flush_task.stop()
+        self._flush_task = None
+        d = self.flush()
+        d.addCallback(self._report_unpushed, spider)
+        return d
+
+    def _report_unpushed(self, _, spider):
+        for key, batch in self._buffers.items():
+            if batch:
+                logger.error(
+                    "Lost %(count)d items that could not be pushed to %(key)s",
+                    {"count": len(batch), "key": key},
+                    extra={"spider": spider},
+                )
 
-    def _process_item(self, item, spider):
+    def process_item(self, item, spider):
         key = self.item_key(item, spider)
+        # Encode now: pipelines running later may modify the item.
         data = self.serialize(item)
-        self.server.rpush(key, data)
-        return item
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(data)
+        if len(buffer) < self.batch_size:
+            return item
+        d = self._flush_key(key)
+        d.addCallback(lambda _: item)
+        return d
+
+    def flush(self):
+        """Push all buffered items to redis.
+
+        Returns
+        -------
+        Deferred
+            Fired once every pending batch has been written.
+
+        """
+        return defer.DeferredList(
+            [self._flush_key(key) for key in list(self._buffers)],
+            fireOnOneErrback=True,
+            consumeErrors=True,
+        )
+
+    def _flush_key(self, key):
+        if not self._buffers.get(key):
+            return defer.succeed(None)
+        lock = self._push_locks.get(key)
+        if lock is None:
+            lock = self._push_locks[key] = defer.DeferredLock()
+        return lock.run(self._push_buffered, key)
+
+    def _push_buffered(self, key):
+        # An earlier queued flush may have pushed these items already.
+        batch = self._buffers.pop(key, None)
+        if not batch:
+            return defer.succeed(None)
+        d = deferToThread(self._push_batch, key, batch)
+        d.addErrback(self._push_failed, key, batch)
+        return d
+
+    def _push_failed(self, failure, key, batch):
+        logger.error(
+            "Failed to push %(count)d items to %(key)s, they will be retried",
+            {"count": len(batch), "key": key},
+            exc_info=failure_to_exc_info(failure),
+        )
+        # Nothing else is pushed to this key meanwhile, so putting the batch
+        # back in front keeps the items in order.
+        self._buffers[key] = batch + self._buffers.get(key, [])
+
+    def _push_batch(self, key, batch):
+        # Runs in the thread pool: a single variadic RPUSH is atomic and costs
+        # one round-trip.
+        self.server.rpush(key, *batch)
 
     def item_key(self, item, spider):
         """Returns redis key based on given spider.
@@ -75,13 +229,8 @@ class RedisPipeline:
         and/or spider.
 
         """
-        if self.settings:
-            return get_effective_key(
-                self.settings,
-                self.key,
-                defaults.JOB_SCOPED_PIPELINE_KEY,
-                spider.name
-            )
+        if self._resolve_key is not None:
+            return self._resolve_key(spider.name)
         else:
             # Fallback for when settings is not available
             return self.key % {"spider": spider.name}
@@ -1,3 +1,4 @@
+import re
 from collections import defaultdict
 
 try:
@@ -11,50 +12,82 @@ from .connection import from_settings as redis_from_settings
 from . import defaults
 
 
+class _Wildcards(dict):
+    """Mapping that expands any key template placeholder to a glob wildcard."""
+
+    def __missing__(self, key):
+        return '*'
+
+
 class RedisStatsCollector:
-    """Prometheus collector that reads stats from Redis and exposes them as metrics."""
-    
-    def __init__(self, server, stats_key_pattern=None):
+    """Prometheus collector that reads stats from Redis and exposes them as metrics.
+
+    ``scan_count`` is the SCAN ``COUNT`` hint and the number of stats hashes
+    fetched per pipelined round-trip. Larger values cover more of the keyspace
+    per round-trip at the cost of longer individual server calls; the Redis
+    default of 10 is far too small for large keyspaces.
+    """
+
+    # Metrics containing any of these names are monotonically increasing.
+    COUNTER_PATTERNS = (
+        'downloader/request_count',
+        'downloader/response_count',
+        'downloader/exception_count',
+        'item_scraped_count',
+        'response_received_count',
+        'scheduler/enqueued',
+        'scheduler/dequeued',
+        'spider_opened_count',
+        'spider_closed_count',
+    )
+    _COUNTER_RE = re.compile('|'.join(re.escape(p) for p in COUNTER_PATTERNS))
+    # Spider name is the segment right before the ":stats" suffix.
+    _SPIDER_RE = re.compile(r'(?:^|:)([^:]+):stats$')
+
+    def __init__(self, server, stats_key_pattern=None, scan_count=defaults.PROMETHEUS_SCAN_COUNT):
         self.server = server
         self.stats_key_pattern = stats_key_pattern or defaults.STATS_KEY
+        self.scan_count = scan_count
         
     def collect(self):
         """Collect metrics from Redis stats keys."""
         if not HAS_PROMETHEUS:
             return
             
-        # Find all stats keys matching the pattern
-        stats_keys = self.server.keys(self.stats_key_pattern.replace('%(spider)s', '*'))
-        
-        # Group metrics by type
-        counter_metrics = defaultdict(dict)
-        gauge_metrics = defaultdict(dict)
-        
-        for key in stats_keys:
-            # Extract spider name from key
-            key_str = key.decode('utf-8') if isinstance(key, bytes) else key
-            spider_name = self._extract_spider_name(key_str)
-            
-            # Get all stats for this spider
-            stats = self.server.hgetall(key)
+        # Flatten every stats hash into parallel lists in one pass. float()
+        # parses bytes directly, so values never need to be decoded.
+        spider_names = []
+        metric_names = []
+        values = []
+        for key, stats in self._iter_stats():
             if not stats:
                 continue
-                
+            # Extract spider name from key
+            spider_name = self._extract_spider_name(
+                key.decode('utf-8') if isinstance(key, bytes) else key
+            )
             for metric_name, value in stats.items():
-                metric_name_str = metric_name.decode('utf-8') if isinstance(metric_name, bytes) else metric_name
-                value_str = value.decode('utf-8') if isinstance(value, bytes) else value
-                
                 try:
-                    numeric_value = float(value_str)
+                    values.append(float(value))
                 except ValueError:
                     continue
-                    
-                # Categorize metrics
-                if self._is_counter_metric(metric_name_str):
-                    counter_metrics[metric_name_str][spider_name] = numeric_value
-                else:
-                    gauge_metrics[metric_name_str][spider_name] = numeric_value
-        
+                spider_names.append(spider_name)
+                metric_names.append(metric_name)
+
+        metric_names = [
+            name.decode('utf-8') if isinstance(name, bytes) else name
+            for name in metric_names
+        ]
+        # Categorize each distinct metric name once.
+        is_counter = {name: self._is_counter_metric(name) for name in set(metric_names)}
+
+        # Group metrics by type
+        counter_metrics = defaultdict(dict)
+        gauge_metrics = defaultdict(dict)
+        for spider_name, metric_name, value in zip(spider_names, metric_names, values):
+            group = counter_metrics if is_counter[metric_name] else gauge_metrics
+            group[metric_name][spider_name] = value
+
         # Yield counter metrics
         for metric_name, spider_values in counter_metrics.items():
             family = CounterMetricFamily(
@@ -77,33 +110,42 @@ class RedisStatsCollector:
                 family.add_metric([spider_name], value)
             yield family
     
+    def _iter_stats(self):
+        """Yield ``(key, stats)`` pairs for every stats key matching the pattern.
+
+        Keys are discovered incrementally with SCAN (KEYS blocks the server on
+        large keyspaces) and their hashes fetched with one pipelined HGETALL
+        round-trip per ``scan_count`` keys.
+        """
+        # Every template placeholder (spider, job_id, ...) becomes a wildcard.
+        pattern = self.stats_key_pattern % _Wildcards()
+        batch = []
+        for key in self.server.scan_iter(match=pattern, count=self.scan_count):
+            batch.append(key)
+            if len(batch) >= self.scan_count:
+                yield from self._fetch_stats(batch)
+                batch = []
+        if batch:
+            yield from self._fetch_stats(batch)
+
+    def _fetch_stats(self, keys):
+        """Fetch the stats hashes of the given keys in a single round-trip."""
+        pipe = self.server.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        return zip(keys, pipe.execute())
+
     def _extract_spider_name(self, key):
         """Extract spider name from Redis key."""
         # Handle both job-scoped and regular keys
         # job-scoped: "job123:myspider:stats" -> "myspider"  
         # regular: "myspider:stats" -> "myspider"
-        parts = key.split(':')
-        if len(parts) >= 3 and parts[-1] == 'stats':
-            return parts[-2]  # spider name is second to last
-        elif len(parts) >= 2 and parts[-1] == 'stats':
-            return parts[-2]  # spider name is second to last
-        else:
-            return 'unknown'
+        match = self._SPIDER_RE.search(key)
+        return match.group(1) if match else 'unknown'
     
     def _is_counter_metric(self, metric_name):
         """Determine if a metric should be treated as a counter (monotonically increasing)."""
-        counter_patterns = [
-            'downloader/request_count',
-            'downloader/response_count', 
-            'downloader/exception_count',
-            'item_scraped_count',
-            'response_received_count',
-            'scheduler/enqueued',
-            'scheduler/dequeued',
-            'spider_opened_count',
-            'spider_closed_count'
-        ]
-        return any(pattern in metric_name for pattern in counter_patterns)
+        return self._COUNTER_RE.search(metric_name) is not None
 
 
 class PrometheusStatsExporter:
@@ -116,10 +158,11 @@ class PrometheusStatsExporter:
         self.port = port
         self.server = redis_from_settings(settings)
         self.stats_key_pattern = settings.get('STATS_KEY', defaults.STATS_KEY)
+        scan_count = settings.getint('PROMETHEUS_SCAN_COUNT', defaults.PROMETHEUS_SCAN_COUNT)
         
         # Create custom registry with our collector
         self.registry = CollectorRegistry()
-        self.collector = RedisStatsCollector(self.server, self.stats_key_pattern)
+        self.collector = RedisStatsCollector(self.server, self.stats_key_pattern, scan_count)
         self.registry.register(self.collector)
         
     def start_server(self):
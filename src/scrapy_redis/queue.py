@@ -5,7 +5,7 @@ try:
 except ImportError:
     from scrapy.utils.reqser import request_to_dict, request_from_dict
 
-from .serializers import get_serializer
+from .serializers import get_default_serializer
 
 
 class Base:
@@ -27,9 +27,10 @@ class Base:
 
         """
         if serializer is None:
-            # Use JSON as default serializer instead of pickle for better compatibility
-            # and performance. Pickle is deprecated for security and portability reasons.
-            serializer = get_serializer('json')
+            # Use MessagePack (or JSON if unavailable) as default serializer
+            # instead of pickle. Pickle is deprecated for security and
+            # portability reasons.
+            serializer = get_default_serializer()
         if not hasattr(serializer, "loads"):
             raise TypeError(
                 f"serializer does not implement 'loads' function: {serializer}"
@@ -65,10 +66,40 @@ class Base:
         """Push a request"""
         raise NotImplementedError
 
+    def push_command(self, request):
+        """Return the redis command and arguments that push a request.
+
+        The command is returned as ``(name, args)`` where ``args`` excludes the
+        queue key. This lets callers such as the scheduler push the request
+        from within a Lua script. Subclasses overriding ``push`` should
+        override this method as well.
+        """
+        raise NotImplementedError
+
     def pop(self, timeout=0):
         """Pop a request"""
         raise NotImplementedError
 
+    def pop_batch(self, count):
+        """Pop up to ``count`` requests in a single round-trip.
+
+        Subclasses should override this; the default pops a single request.
+        """
+        request = self.pop()
+        return [request] if request else []
+
+    def push_front(self, requests):
+        """Give back popped requests so that they are popped next, in order.
+
+        The default pushes them one by one, which is right for queues ordered
+        by the requests themselves, such as the priority queue.
+        """
+        for request in requests:
+            self.push(request)
+
+    def _decode_requests(self, results):
+        return [self._decode_request(data) for data in results if data]
+
     def clear(self):
         """Clear queue/stack"""
         self.server.delete(self.key)
@@ -85,6 +116,16 @@ class FifoQueue(Base):
         """Push a request"""
         self.server.lpush(self.key, self._encode_request(request))
 
+    def push_command(self, request):
+        return "LPUSH", [self._encode_request(request)]
+
+    def push_front(self, requests):
+        """Give back popped requests so that they are popped next, in order"""
+        if requests:
+            # Requests are popped from the tail: the first one goes last.
+            encoded = [self._encode_request(request) for request in requests]
+            self.server.rpush(self.key, *reversed(encoded))
+
     def pop(self, timeout=0):
         """Pop a request"""
         if timeout > 0:
@@ -96,6 +137,15 @@ class FifoQueue(Base):
         if data:
             return self._decode_request(data)
 
+    def pop_batch(self, count):
+        """Pop up to ``count`` requests"""
+        with self.server.pipeline() as pipe:
+            pipe.lrange(self.key, -count, -1)
+            pipe.ltrim(self.key, 0, -count - 1)
+            results, _ = pipe.execute()
+        # Oldest requests are at the tail of the list.
+        return self._decode_requests(reversed(results))
+
 
 class PriorityQueue(Base):
     """Per-spider priority queue abstraction using redis' sorted set"""
@@ -113,6 +163,9 @@ class PriorityQueue(Base):
         # kwargs only accepts strings, not bytes.
         self.server.execute_command("ZADD", self.key, score, data)
 
+    def push_command(self, request):
+        return "ZADD", [-request.priority, self._encode_request(request)]
+
     def pop(self, timeout=0):
         """
         Pop a request
@@ -126,6 +179,14 @@ class PriorityQueue(Base):
         if results:
             return self._decode_request(results[0])
 
+    def pop_batch(self, count):
+        """Pop up to ``count`` highest priority requests"""
+        with self.server.pipeline() as pipe:
+            pipe.zrange(self.key, 0, count - 1)
+            pipe.zremrangebyrank(self.key, 0, count - 1)
+            results, _ = pipe.execute()
+        return self._decode_requests(results)
+
 
 class LifoQueue(Base):
     """Per-spider LIFO queue."""
@@ -138,6 +199,16 @@ class LifoQueue(Base):
         """Push a request"""
         self.server.lpush(self.key, self._encode_request(request))
 
+    def push_command(self, request):
+        return "LPUSH", [self._encode_request(request)]
+
+    def push_front(self, requests):
+        """Give back popped requests so that they are popped next, in order"""
+        if requests:
+            # Requests are popped from the head: the first one goes last.
+            encoded = [self._encode_request(request) for request in requests]
+            self.server.lpush(self.key, *reversed(encoded))
+
     def pop(self, timeout=0):
         """Pop a request"""
         if timeout > 0:
@@ -150,6 +221,14 @@ class LifoQueue(Base):
         if data:
             return self._decode_request(data)
 
+    def pop_batch(self, count):
+        """Pop up to ``count`` requests"""
+        with self.server.pipeline() as pipe:
+            pipe.lrange(self.key, 0, count - 1)
+            pipe.ltrim(self.key, count, -1)
+            results, _ = pipe.execute()
+        return self._decode_requests(results)
+
 
 # Deprecated aliases for backward compatibility
 def __getattr__(name):
@@ -5,6 +5,7 @@ from scrapy.exceptions import IgnoreRequest, NotConfigured
 from twisted.internet.error import TimeoutError, DNSLookupError, ConnectionRefusedError, ConnectionDone, ConnectError, ConnectionLost
 
 from . import defaults
+from .stats import LocalCounters
 
 
 class SimpleRedisRetryMiddleware:
@@ -33,6 +34,9 @@ class SimpleRedisRetryMiddleware:
         
         # We'll store the scheduler reference to requeue requests
         self.scheduler = None
+        # Retry requests waiting to be requeued at the end of the reactor tick
+        self._retry_buf = []
+        self._flush_pending = False
         
         self.logger = logging.getLogger(__name__)
         
@@ -40,11 +44,31 @@ class SimpleRedisRetryMiddleware:
     def from_crawler(cls, crawler):
         instance = cls(crawler.settings)
         crawler.signals.connect(instance.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(instance.spider_closed, signal=signals.spider_closed)
         return instance
         
     def spider_opened(self, spider):
         """Get reference to scheduler for requeuing."""
         self.scheduler = spider.crawler.engine.scheduler
+        # Requeue buffered retries before the scheduler flushes its queue.
+        add_close_hook = getattr(self.scheduler, 'add_close_hook', None)
+        if add_close_hook is not None:
+            add_close_hook(self._flush_retries)
+
+    def spider_closed(self, spider):
+        """Requeue or drop retry requests that missed the scheduler close hook."""
+        if getattr(self.scheduler, 'persist', False):
+            self._flush_retries()
+        else:
+            # The queue was already cleared, requeuing would leave stale keys.
+            self._flush_pending = False
+            pending, self._retry_buf = self._retry_buf, []
+            for retry_request, _, reason, spider in pending:
+                self.logger.warning(
+                    "Dropping retry request %(request)s after the scheduler closed: %(reason)s",
+                    {'request': retry_request, 'reason': reason}, extra={'spider': spider}
+                )
+        self.scheduler = None
         
     def process_response(self, request, response, spider):
         """Process response and retry if needed."""
@@ -66,64 +90,130 @@ class SimpleRedisRetryMiddleware:
         
         if retry_count >= self.max_retry_times:
             self.logger.debug(
-                f"Gave up retrying %(request)s (failed {retry_count} times): %(reason)s",
-                {'request': request, 'reason': reason}, extra={'spider': spider}
+                "Gave up retrying %(request)s (failed %(retry_count)d times): %(reason)s",
+                {'request': request, 'retry_count': retry_count, 'reason': reason},
+                extra={'spider': spider}
             )
             # Could put in dead letter queue here in the future
             return None
             
-        # Create retry request with incremented count and adjusted priority
+        # Create retry request with incremented count and adjusted priority.
+        # Adjust priority - lower priority for retries with exponential backoff
+        # Each retry gets progressively lower priority
         retry_count += 1
+        backoff_factor = 1 << (retry_count - 1)  # 1, 2, 4, 8, ...
         retry_request = request.replace(
-            meta=request.meta.copy()
+            meta={
+                **request.meta,
+                'retry_count': retry_count,
+                'retry_reason': reason,
+                'retry_time': time.time(),
+            },
+            priority=getattr(request, 'priority', 0) + self.priority_adjust * backoff_factor,
         )
-        retry_request.meta['retry_count'] = retry_count
-        retry_request.meta['retry_reason'] = reason
-        retry_request.meta['retry_time'] = time.time()
-        
-        # Adjust priority - lower priority for retries with exponential backoff
-        # Each retry gets progressively lower priority
-        original_priority = getattr(request, 'priority', 0)
-        backoff_factor = 2 ** (retry_count - 1)  # 1, 2, 4, 8, ...
-        retry_request.priority = original_priority + (self.priority_adjust * backoff_factor)
         
-        # Put back in scheduler queue if available
+        # Put back in scheduler queue if available. Retries are buffered and
+        # requeued together at the end of the reactor tick, so bursts of
+        # failures cost a single round-trip.
         if self.scheduler and hasattr(self.scheduler, 'enqueue_request'):
-            if self.scheduler.enqueue_request(retry_request):
-                self.logger.debug(
-                    f"Retrying %(request)s (failed {retry_count-1} times, retry #{retry_count}): %(reason)s",
-                    {'request': retry_request, 'reason': reason}, extra={'spider': spider}
-                )
-            else:
-                self.logger.debug(
-                    f"Failed to requeue retry request %(request)s: %(reason)s", 
-                    {'request': retry_request, 'reason': reason}, extra={'spider': spider}
-                )
+            self._retry_buf.append((retry_request, retry_count, reason, spider))
+            if not self._flush_pending:
+                from twisted.internet import reactor
+                self._flush_pending = True
+                reactor.callLater(0, self._flush_retries)
         else:
             self.logger.warning(
-                f"No scheduler available for retry: %(request)s",
+                "No scheduler available for retry: %(request)s",
                 {'request': retry_request}, extra={'spider': spider}
             )
             
         return None  # Don't continue processing the original request
 
+    def _flush_retries(self):
+        """Requeue all buffered retry requests."""
+        self._flush_pending = False
+        pending, self._retry_buf = self._retry_buf, []
+        if not pending:
+            return
+        requests = [retry_request for retry_request, _, _, _ in pending]
+        enqueue_requests = getattr(self.scheduler, 'enqueue_requests', None)
+        try:
+            if enqueue_requests is not None:
+                results = enqueue_requests(requests)
+            else:
+                results = [self.scheduler.enqueue_request(request) for request in requests]
+        except Exception:
+            self.logger.exception(
+                "Failed to requeue %(count)d retry requests", {'count': len(pending)}
+            )
+            for retry_request, _, reason, spider in pending:
+                self.logger.error(
+                    "Lost retry request %(request)s: %(reason)s",
+                    {'request': retry_request, 'reason': reason}, extra={'spider': spider}
+                )
+            return
+
+        for (retry_request, retry_count, reason, spider), enqueued in zip(pending, results):
+            if enqueued:
+                self.logger.debug(
+                    "Retrying %(request)s (failed %(failed)d times, retry #%(retry_count)d): %(reason)s",
+                    {
+                        'request': retry_request,
+                        'failed': retry_count - 1,
+                        'retry_count': retry_count,
+                        'reason': reason,
+                    },
+                    extra={'spider': spider}
+                )
+            else:
+                self.logger.debug(
+                    "Failed to requeue retry request %(request)s: %(reason)s",
+                    {'request': retry_request, 'reason': reason}, extra={'spider': spider}
+                )
+
 
 class RedisRetryStatsCollector:
-    """Collect retry-related statistics for monitoring."""
+    """Collect retry-related statistics for monitoring.
+
+    Counters are aggregated locally and applied to the stats collector every
+    ``STATS_COUNTERS_FLUSH_INTERVAL`` seconds and when the spider closes.
+    """
     
-    def __init__(self, stats):
+    def __init__(self, stats, flush_interval=defaults.STATS_COUNTERS_FLUSH_INTERVAL):
         self.stats = stats
+        self.flush_interval = flush_interval
+        self.counters = LocalCounters(stats, max_pending=1000 if flush_interval > 0 else 1)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        instance = cls(
+            crawler.stats,
+            crawler.settings.getfloat(
+                'STATS_COUNTERS_FLUSH_INTERVAL', defaults.STATS_COUNTERS_FLUSH_INTERVAL
+            ),
+        )
+        crawler.signals.connect(instance.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(instance.spider_closed, signal=signals.spider_closed)
+        return instance
+
+    def spider_opened(self, spider):
+        """Start periodic flushing of retry counters."""
+        self.counters.start(self.flush_interval)
+
+    def spider_closed(self, spider):
+        """Flush pending retry counters."""
+        self.counters.stop()
         
     def retry_attempted(self, request, spider):
         """Record retry attempt."""
-        self.stats.inc_value('retry/count', spider=spider)
+        self.counters.inc('retry/count', spider=spider)
         retry_count = request.meta.get('retry_count', 0)
-        self.stats.inc_value(f'retry/count_{retry_count}', spider=spider)
+        self.counters.inc(f'retry/count_{retry_count}', spider=spider)
         
     def retry_gave_up(self, request, spider):
         """Record when we give up on a request."""
-        self.stats.inc_value('retry/gave_up', spider=spider)
+        self.counters.inc('retry/gave_up', spider=spider)
         
     def retry_requeued(self, request, spider):
         """Record successful requeue."""
-        self.stats.inc_value('retry/requeued', spider=spider)
\ No newline at end of file
+        self.counters.inc('retry/requeued', spider=spider)
@@ -1,16 +1,38 @@
 import importlib
 import os
+from collections import deque
 
 from scrapy.utils.misc import load_object
 
 from . import connection, defaults
+from .dupefilter import RedisDupeFilter
+from .queue import Base as BaseQueue
+from .stats import LocalCounters
 from .utils import get_effective_key
-from .serializers import get_serializer
+from .serializers import get_default_serializer, get_serializer
+
+# Records the request fingerprint and, if it was not seen before, refreshes the
+# dupefilter TTL (when positive) and pushes the request with the queue's own
+# command. Deduplicating and enqueuing thus takes a single atomic round-trip.
+ENQUEUE_SCRIPT = """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+if tonumber(ARGV[2]) > 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+redis.call(ARGV[3], KEYS[2], unpack(ARGV, 4))
+return 1
+"""
 
 
 class Scheduler:
     """Redis-based scheduler
 
+    The queue length is tracked locally from this scheduler's own pushes and
+    pops and re-read from redis every ``LEN_RESYNC_INTERVAL`` operations, so
+    ``len()`` and ``has_pending_requests()`` rarely need a round-trip.
+
     Settings
     --------
     SCHEDULER_PERSIST : bool (default: False)
@@ -29,9 +51,24 @@ class Scheduler:
         Scheduler dupefilter class.
     SCHEDULER_SERIALIZER : str
         Scheduler serializer.
+    SCHEDULER_SERIALIZER_FORCE_LEGACY : bool (default: False)
+        Whether to default to the JSON serializer used by earlier releases.
+    SCHEDULER_PREFETCH : int (default: 32)
+        How many requests to pop from redis per round-trip. Use 1 to pop one
+        request at a time. Prefetched requests are only held in memory: they
+        are given back to redis when a persistent scheduler closes, but up to
+        this many requests are lost if the process crashes.
+    STATS_COUNTERS_FLUSH_INTERVAL : float (default: 2.0)
+        Seconds between applying the locally aggregated scheduler counters to
+        the stats collector. Use 0 to apply them immediately. Counters are
+        always applied immediately to collectors that buffer updates
+        themselves, such as ``RedisStatsCollector``, or keep them in memory.
 
     """
 
+    # Queue operations after which the tracked queue length is re-read.
+    LEN_RESYNC_INTERVAL = 256
+
     def __init__(
         self,
         server,
@@ -45,6 +82,8 @@ class Scheduler:
         idle_before_close=0,
         serializer=None,
         job_id=None,
+        prefetch=defaults.SCHEDULER_PREFETCH,
+        stats_flush_interval=defaults.STATS_COUNTERS_FLUSH_INTERVAL,
     ):
         """Initialize scheduler.
 
@@ -70,10 +109,16 @@ class Scheduler:
             Timeout before giving up.
         job_id : str, optional
             Job identifier for unique naming. Uses SCRAPY_JOB env var if not provided.
+        prefetch : int
+            Number of requests popped from redis per round-trip.
+        stats_flush_interval : float
+            Seconds between flushes of the scheduler counters.
 
         """
         if idle_before_close < 0:
             raise TypeError("idle_before_close cannot be negative")
+        if prefetch < 1:
+            raise TypeError("prefetch must be greater than zero")
 
         self.server = server
         self.persist = persist
@@ -87,9 +132,28 @@ class Scheduler:
         self.serializer = serializer
         self.job_id = job_id or os.environ.get('SCRAPY_JOB')
         self.stats = None
+        self.prefetch = prefetch
+        # Requests already popped from redis but not yet handed to the engine.
+        self._prefetched = deque()
+        self.stats_flush_interval = stats_flush_interval
+        self._counters = None
+        self._enqueue_script = None
+        # Locally tracked queue length, None when it must be re-read.
+        self._queue_len = None
+        self._len_ops = 0
+        # Callables run at the start of close(), before the queue is flushed.
+        self._close_hooks = []
 
     def __len__(self):
-        return len(self.queue)
+        if self._queue_len is None or self._len_ops >= self.LEN_RESYNC_INTERVAL:
+            self._queue_len = len(self.queue)
+            self._len_ops = 0
+        return self._queue_len + len(self._prefetched)
+
+    def _track_len(self, delta):
+        if self._queue_len is not None:
+            self._queue_len = max(self._queue_len + delta, 0)
+        self._len_ops += 1
 
     @classmethod
     def from_settings(cls, settings):
@@ -97,6 +161,13 @@ class Scheduler:
             "persist": settings.getbool("SCHEDULER_PERSIST"),
             "flush_on_start": settings.getbool("SCHEDULER_FLUSH_ON_START"),
             "idle_before_close": settings.getint("SCHEDULER_IDLE_BEFORE_CLOSE"),
+            "prefetch": settings.getint(
+                "SCHEDULER_PREFETCH", defaults.SCHEDULER_PREFETCH
+            ),
+            "stats_flush_interval": settings.getfloat(
+                "STATS_COUNTERS_FLUSH_INTERVAL",
+                defaults.STATS_COUNTERS_FLUSH_INTERVAL,
+            ),
         }
 
         # If these values are missing, it means we want to use the defaults.
@@ -140,6 +211,13 @@ class Scheduler:
                     kwargs["serializer"] = importlib.import_module(serializer_setting)
                 else:
                     raise e
+        else:
+            kwargs["serializer"] = get_default_serializer(
+                settings.getbool(
+                    "SCHEDULER_SERIALIZER_FORCE_LEGACY",
+                    defaults.SCHEDULER_SERIALIZER_FORCE_LEGACY,
+                )
+            )
 
         server = connection.from_settings(settings)
         # Ensure the connection is working.
@@ -180,35 +258,151 @@ class Scheduler:
         if not self.df:
             self.df = load_object(self.dupefilter_cls).from_spider(spider)
 
+        if self.stats:
+            # Without periodic flushes every increment is applied right away.
+            max_pending = 1000 if self.stats_flush_interval > 0 else 1
+            self._counters = LocalCounters(self.stats, max_pending=max_pending)
+            self._counters.start(self.stats_flush_interval)
+
+        if self._supports_atomic_enqueue():
+            self._enqueue_script = self.server.register_script(ENQUEUE_SCRIPT)
+
         if self.flush_on_start:
             self.flush()
         # notice if there are requests already in the queue to resume the crawl
-        if len(self.queue):
-            spider.log(f"Resuming crawl ({len(self.queue)} requests scheduled)")
+        self._queue_len = len(self.queue)
+        self._len_ops = 0
+        if self._queue_len:
+            spider.log(f"Resuming crawl ({self._queue_len} requests scheduled)")
+
+    def add_close_hook(self, func):
+        """Call ``func()`` when closing, while requests can still be enqueued."""
+        self._close_hooks.append(func)
 
     def close(self, reason):
+        for func in self._close_hooks:
+            func()
+        if self._counters:
+            self._counters.stop()
         if not self.persist:
             self.flush()
+        else:
+            # Give back requests that were prefetched but never scheduled,
+            # in their original place in the queue.
+            prefetched = list(self._prefetched)
+            self._prefetched.clear()
+            self.queue.push_front(prefetched)
+            self._track_len(len(prefetched))
 
     def flush(self):
         self.df.clear()
         self.queue.clear()
+        self._prefetched.clear()
+        self._queue_len = 0
 
     def enqueue_request(self, request):
-        if not request.dont_filter and self.df.request_seen(request):
-            self.df.log(request, self.spider)
-            return False
-        if self.stats:
-            self.stats.inc_value("scheduler/enqueued/redis", spider=self.spider)
-        self.queue.push(request)
+        if request.dont_filter:
+            self.queue.push(request)
+        elif self._enqueue_script is not None:
+            if not self._push_unseen(request):
+                self.df.log(request, self.spider)
+                return False
+        else:
+            if self.df.request_seen(request):
+                self.df.log(request, self.spider)
+                return False
+            self.queue.push(request)
+        self._request_enqueued()
         return True
 
+    def enqueue_requests(self, requests):
+        """Enqueue several requests at once.
+
+        With atomic enqueue available, all requests are deduplicated and
+        pushed in a single pipelined round-trip.
+
+        Returns
+        -------
+        list of bool
+            The ``enqueue_request`` result for each request.
+
+        """
+        if self._enqueue_script is None:
+            return [self.enqueue_request(request) for request in requests]
+
+        pipe = self.server.pipeline(transaction=False)
+        for request in requests:
+            if request.dont_filter:
+                command, args = self.queue.push_command(request)
+                pipe.execute_command(command, self.queue.key, *args)
+            else:
+                self._push_unseen(request, client=pipe)
+        results = pipe.execute()
+
+        enqueued = []
+        for request, result in zip(requests, results):
+            if request.dont_filter or result == 1:
+                self._request_enqueued()
+                enqueued.append(True)
+            else:
+                self.df.log(request, self.spider)
+                enqueued.append(False)
+        return enqueued
+
+    def _request_enqueued(self):
+        self._track_len(1)
+        if self._counters:
+            self._counters.inc("scheduler/enqueued/redis", spider=self.spider)
+
+    def _supports_atomic_enqueue(self):
+        """Whether dedupe and push can be done by ``ENQUEUE_SCRIPT``.
+
+        This requires the stock redis dupefilter logic and a queue that
+        describes its push command.
+        """
+        return (
+            isinstance(self.df, RedisDupeFilter)
+            and type(self.df).request_seen is RedisDupeFilter.request_seen
+            and type(self.queue).push_command is not BaseQueue.push_command
+        )
+
+    def _push_unseen(self, request, client=None):
+        """Push the request unless already seen. Returns True if pushed.
+
+        If ``client`` is a pipeline the script is only queued on it and its
+        result is returned by the pipeline's ``execute``.
+        """
+        command, args = self.queue.push_command(request)
+        fp = self.df.request_fingerprint(request)
+        added = self._enqueue_script(
+            keys=[self.df.key, self.queue.key],
+            args=[fp, self.df.ttl_ms, command, *args],
+            client=client,
+        )
+        return added == 1
+
     def next_request(self):
-        block_pop_timeout = self.idle_before_close
-        request = self.queue.pop(block_pop_timeout)
-        if request and self.stats:
-            self.stats.inc_value("scheduler/dequeued/redis", spider=self.spider)
+        if not self._prefetched and self.prefetch > 1:
+            batch = self.queue.pop_batch(self.prefetch)
+            self._track_len(-len(batch))
+            self._prefetched.extend(batch)
+        if self._prefetched:
+            request = self._prefetched.popleft()
+        else:
+            block_pop_timeout = self.idle_before_close
+            request = self.queue.pop(block_pop_timeout)
+            if request:
+                self._track_len(-1)
+            else:
+                self._queue_len = 0
+        if request and self._counters:
+            self._counters.inc("scheduler/dequeued/redis", spider=self.spider)
         return request
 
     def has_pending_requests(self):
+        if len(self) > 0:
+            return True
+        # Confirm emptiness with redis as other workers may have pushed
+        # requests since the length was last read.
+        self._queue_len = None
         return len(self) > 0
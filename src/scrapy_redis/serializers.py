@@ -1,84 +1,177 @@
+import functools
 import json
+import threading
 import warnings
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+
 try:
     import msgpack
     HAS_MSGPACK = True
 except ImportError:
     HAS_MSGPACK = False
 
-from . import picklecompat
+from . import defaults, picklecompat
 
 
 class JsonSerializer:
-    """JSON serializer with UTF-8 encoding support for Redis storage."""
-    
-    @staticmethod
-    def loads(data):
-        """Load data from JSON bytes."""
-        if isinstance(data, bytes):
-            data = data.decode('utf-8')
-        return json.loads(data)
+    """JSON serializer with UTF-8 encoding support for Redis storage.
+
+    Uses orjson when installed, otherwise the standard library ``json``.
+    ``loads`` and ``dumps`` are bound per instance to a prebuilt encoder and
+    decoder so no encoder is constructed on the per-request path.
+    """
+
+    __slots__ = ('dumps', 'loads')
+
+    def __init__(self):
+        if HAS_ORJSON:
+            # orjson emits UTF-8 bytes in one pass and accepts bytes input.
+            self.loads = orjson.loads
+            self.dumps = functools.partial(
+                orjson.dumps, option=orjson.OPT_NON_STR_KEYS
+            )
+            return
+
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        decode = json.JSONDecoder().decode
+
+        def loads(data):
+            """Load data from JSON bytes."""
+            # Redis replies are bytes: decode them straight away and only
+            # fall back for callers passing already decoded text.
+            try:
+                data = str(data, 'utf-8')
+            except TypeError:
+                pass
+            return decode(data)
 
-    @staticmethod
-    def dumps(obj):
-        """Dump object to JSON bytes."""
-        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        def dumps(obj):
+            """Dump object to JSON bytes."""
+            return encode(obj).encode('utf-8')
+
+        self.loads = loads
+        self.dumps = dumps
+
+
+class _ThreadLocalCodec(threading.local):
+    """Encode/decode callables built by ``factory`` once per thread.
+
+    Reusable encoders keep internal buffers and must not be shared between
+    threads, e.g. pipelines or user code running in the reactor thread pool.
+    """
+
+    def __init__(self, factory):
+        self.dumps, self.loads = factory()
+
+
+def _msgpack_codec():
+    return msgpack.Packer().pack, functools.partial(msgpack.unpackb, raw=False)
+
+
+def _msgspec_codec():
+    return msgspec.msgpack.Encoder().encode, msgspec.msgpack.Decoder().decode
 
 
 class MsgpackSerializer:
     """MessagePack serializer for compact binary serialization."""
-    
-    @staticmethod
-    def loads(data):
-        """Load data from MessagePack bytes."""
-        if not HAS_MSGPACK:
-            raise ImportError("msgpack is required for MsgpackSerializer")
-        return msgpack.unpackb(data, raw=False)
 
-    @staticmethod 
-    def dumps(obj):
-        """Dump object to MessagePack bytes."""
+    __slots__ = ('dumps', 'loads')
+
+    def __init__(self):
         if not HAS_MSGPACK:
             raise ImportError("msgpack is required for MsgpackSerializer")
-        return msgpack.packb(obj)
+        codec = _ThreadLocalCodec(_msgpack_codec)
+        self.loads = lambda data: codec.loads(data)
+        self.dumps = lambda obj: codec.dumps(obj)
 
 
-class PickleSerializer:
-    """Pickle serializer wrapper (deprecated - use for backward compatibility only)."""
-    
-    @staticmethod
-    def loads(data):
-        """Load data from pickle bytes."""
+class MsgspecMsgpackSerializer:
+    """MessagePack serializer backed by msgspec's C encoder/decoder.
+
+    The wire format is plain MessagePack, so payloads are interchangeable
+    with ``MsgpackSerializer``.
+    """
+
+    __slots__ = ('dumps', 'loads')
+
+    def __init__(self):
+        if not HAS_MSGSPEC:
+            raise ImportError("msgspec is required for MsgspecMsgpackSerializer")
+        codec = _ThreadLocalCodec(_msgspec_codec)
+        self.loads = lambda data: codec.loads(data)
+        self.dumps = lambda obj: codec.dumps(obj)
+
+
+_pickle_warned = False
+
+
+def _warn_pickle_once():
+    global _pickle_warned
+    if not _pickle_warned:
+        _pickle_warned = True
         warnings.warn(
             "Pickle serialization is deprecated for security reasons. "
             "Use 'json' or 'msgpack' serializers instead.",
             DeprecationWarning,
             stacklevel=3
         )
-        return picklecompat.loads(data)
 
-    @staticmethod
-    def dumps(obj):
-        """Dump object to pickle bytes."""
-        warnings.warn(
-            "Pickle serialization is deprecated for security reasons. "
-            "Use 'json' or 'msgpack' serializers instead.", 
-            DeprecationWarning,
-            stacklevel=3
-        )
-        return picklecompat.dumps(obj)
+
+class PickleSerializer:
+    """Pickle serializer wrapper (deprecated - use for backward compatibility only).
+
+    The deprecation warning is emitted once per process, when the first
+    instance is created, to keep it off the per-request path.
+    """
+
+    loads = staticmethod(picklecompat.loads)
+    dumps = staticmethod(picklecompat.dumps)
+
+    def __init__(self):
+        _warn_pickle_once()
 
 
 # Registry of available serializers
 SERIALIZERS = {
     'json': JsonSerializer,
-    'msgpack': MsgpackSerializer,
+    # Prefer msgspec, both produce the same MessagePack wire format.
+    'msgpack': MsgspecMsgpackSerializer if HAS_MSGSPEC else MsgpackSerializer,
+    'msgpack-legacy': MsgpackSerializer,
     'pickle': PickleSerializer,
     'picklecompat': PickleSerializer,  # Alias for backward compatibility
 }
 
 
+def get_default_serializer(force_legacy=False):
+    """Get the default scheduler serializer instance.
+
+    This is ``defaults.SCHEDULER_SERIALIZER`` (MessagePack, written with
+    msgspec when installed, else with the required msgpack). ``force_legacy``
+    keeps the JSON format used by earlier releases so that queues written by
+    older workers remain readable during an upgrade.
+
+    Raises
+    ------
+    ImportError
+        If no MessagePack library is installed. Falling back to another
+        format would make this worker unreadable by the others.
+    """
+    if force_legacy:
+        return get_serializer('json')
+    return get_serializer(defaults.SCHEDULER_SERIALIZER)
+
+
 def get_serializer(name_or_class):
     """Get serializer instance from name or class."""
     if isinstance(name_or_class, str):
@@ -94,6 +187,8 @@ def get_serializer(name_or_class):
                 return cls()
             except (ValueError, ImportError, AttributeError):
                 raise ValueError(f"Unknown serializer: {name_or_class}")
+    elif isinstance(name_or_class, type):
+        return name_or_class()
     elif hasattr(name_or_class, 'loads') and hasattr(name_or_class, 'dumps'):
         # Already a serializer instance
         return name_or_class
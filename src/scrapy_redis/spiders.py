@@ -1,17 +1,28 @@
 import json
 import time
 from collections.abc import Iterable
+from json import JSONDecodeError
 
 from scrapy import FormRequest, signals
 from scrapy import version_info as scrapy_version
 from scrapy.exceptions import DontCloseSpider
 from scrapy.spiders import CrawlSpider, Spider
 
-from scrapy_redis.utils import TextColor
+from scrapy_redis.utils import TextColor, paint
 
 from . import connection, defaults
 from .utils import bytes_to_str, is_dict, get_effective_key
 
+# Warnings logged for each malformed message, colored once at import.
+STRING_REQUEST_WARNING = paint(
+    TextColor.WARNING,
+    "WARNING: String request is deprecated, please use JSON data format. "
+    "Detail information, please check https://github.com/rmax/scrapy-redis#features",
+)
+NO_URL_WARNING = paint(
+    TextColor.WARNING, "The data from Redis has no url key in push data"
+)
+
 
 class RedisMixin:
     """Mixin class to implement reading urls from a redis queue."""
@@ -187,19 +198,18 @@ class RedisMixin:
         """
         formatted_data = bytes_to_str(data, self.redis_encoding)
 
+        parameter = None
         if is_dict(formatted_data):
-            parameter = json.loads(formatted_data)
-        else:
-            self.logger.warning(
-                f"{TextColor.WARNING}WARNING: String request is deprecated, please use JSON data format. "
-                f"Detail information, please check https://github.com/rmax/scrapy-redis#features{TextColor.ENDC}"
-            )
+            try:
+                parameter = json.loads(formatted_data)
+            except JSONDecodeError:
+                pass
+        if parameter is None:
+            self.logger.warning(STRING_REQUEST_WARNING)
             return FormRequest(formatted_data, dont_filter=True)
 
         if parameter.get("url", None) is None:
-            self.logger.warning(
-                f"{TextColor.WARNING}The data from Redis has no url key in push data{TextColor.ENDC}"
-            )
+            self.logger.warning(NO_URL_WARNING)
             return []
 
         url = parameter.pop("url")
@@ -1,25 +1,117 @@
+import logging
+import operator
+import queue
+import threading
+from collections import Counter, defaultdict
 from datetime import datetime
 
-from scrapy.statscollectors import StatsCollector
+from scrapy import signals
+from scrapy.statscollectors import (
+    DummyStatsCollector,
+    MemoryStatsCollector,
+    StatsCollector,
+)
+from twisted.internet import task
 
 from .connection import from_settings as redis_from_settings
 from . import defaults
-from .utils import convert_bytes_to_str, get_effective_key
+from .utils import build_key_resolver
+
+logger = logging.getLogger(__name__)
+
+# Store ARGV[2] in field ARGV[1] when the field is missing or when the new
+# value compares favourably; evaluated server-side so it costs one round-trip
+# and cannot race with other processes sharing the stats hash.
+MAX_VALUE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current or tonumber(ARGV[2]) > tonumber(current) then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+MIN_VALUE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current or tonumber(ARGV[2]) < tonumber(current) then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+# Maximum number of fields written by each HSET of set_stats.
+SET_STATS_CHUNK_SIZE = 1000
 
 
 class RedisStatsCollector(StatsCollector):
     """
     Stats Collector based on Redis
+
+    Writes are buffered in memory: increments for the same field are summed,
+    only the latest value set for a field is kept, and so is only the largest
+    (or smallest) value given to ``max_value`` (or ``min_value``). Buffers are
+    written with a single pipeline once ``STATS_FLUSH_SIZE`` distinct fields are
+    pending, every ``STATS_FLUSH_INTERVAL`` seconds while a spider is open,
+    before any read, and when the spider closes or the engine stops.
+
+    Redis commands run in a background writer thread fed through a queue, so
+    stats updates never wait on the network in the reactor thread; the single
+    writer keeps them in order. Reads wait for pending writes first.
+
+    Settings
+    --------
+    STATS_FLUSH_INTERVAL : float (default: 1.0)
+        Seconds between periodic flushes. Use 0 to disable periodic flushing.
+    STATS_FLUSH_SIZE : int (default: 100)
+        Number of distinct pending fields that triggers a flush. Use 1 to
+        write every update immediately.
+
+    The client is built by ``connection.from_settings``, so the connection
+    pool is sized with ``REDIS_POOL_SIZE`` and sockets time out after
+    ``REDIS_SOCKET_TIMEOUT`` seconds. Its replies are decoded to ``str``,
+    using the hiredis parser when the ``hiredis`` extra is installed.
     """
 
+    #: Updates are already aggregated in memory, so ``LocalCounters`` passes
+    #: them through instead of aggregating them a second time.
+    buffers_writes = True
+
     def __init__(self, crawler, spider=None):
         super().__init__(crawler)
-        self.server = redis_from_settings(crawler.settings)
+        # Replies are decoded by the connection (in C when hiredis is
+        # installed) so stats come back as str without post-processing.
+        self.server = redis_from_settings(crawler.settings, decode_responses=True)
         self.spider = spider
         self.spider_name = spider.name if spider else crawler.spidercls.name
         self.stats_key = crawler.settings.get("STATS_KEY", defaults.STATS_KEY)
         self.persist = crawler.settings.get("SCHEDULER_PERSIST", defaults.SCHEDULER_PERSIST)
         self.settings = crawler.settings
+        self._resolve_key = build_key_resolver(
+            self.settings, self.stats_key, defaults.JOB_SCOPED_STATS_KEY
+        )
+        self.flush_interval = crawler.settings.getfloat(
+            "STATS_FLUSH_INTERVAL", defaults.STATS_FLUSH_INTERVAL
+        )
+        self.flush_size = crawler.settings.getint(
+            "STATS_FLUSH_SIZE", defaults.STATS_FLUSH_SIZE
+        )
+        # Pending increments per (stats key, field), the start value of
+        # counters that may not exist yet, pending values per stats key, and
+        # pending extremes per (stats key, field).
+        self._inc_buf = Counter()
+        self._inc_start = {}
+        self._set_buf = defaultdict(dict)
+        self._max_buf = {}
+        self._min_buf = {}
+        self._flush_task = None
+        # Writes handed over to the writer thread, as (func, args, done).
+        self._queue = queue.SimpleQueue()
+        # The writer thread clears ``_writer`` itself when it exits, so there
+        # is never more than one writer; ``_writer_lock`` guards both fields.
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        # Generation of the latest stop request, see ``_stop_writer``.
+        self._stop_gen = 0
+        crawler.signals.connect(self._stop_writer, signal=signals.engine_stopped)
+        self._max_script = self.server.register_script(MAX_VALUE_SCRIPT)
+        self._min_script = self.server.register_script(MIN_VALUE_SCRIPT)
 
     def _get_key(self, spider=None):
         """Return the hash name of stats"""
@@ -30,13 +122,8 @@ class RedisStatsCollector(StatsCollector):
             spider_name = self.spider.name
         else:
             spider_name = self.spider_name or "scrapy"
-            
-        return get_effective_key(
-            self.settings,
-            self.stats_key,
-            defaults.JOB_SCOPED_STATS_KEY,
-            spider_name
-        )
+
+        return self._resolve_key(spider_name)
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -48,53 +135,285 @@ class RedisStatsCollector(StatsCollector):
 
     def get_value(self, key, default=None, spider=None):
         """Return the value of hash stats"""
-        if self.server.hexists(self._get_key(spider), key):
-            return int(self.server.hget(self._get_key(spider), key))
-        else:
+        self.flush(wait=True)
+        value = self.server.hget(self._get_key(spider), key)
+        if value is None:
             return default
+        return int(value)
 
     def get_stats(self, spider=None):
         """Return the all of the values of hash stats"""
-        stats = self.server.hgetall(self._get_key(spider))
-        if stats:
-            return convert_bytes_to_str(stats)
-        return {}
+        self.flush(wait=True)
+        return self.server.hgetall(self._get_key(spider))
 
     def set_value(self, key, value, spider=None):
         """Set the value according to hash key of stats"""
-        if isinstance(value, datetime):
+        if value.__class__ is datetime:
             value = value.timestamp()
-        self.server.hset(self._get_key(spider), key, value)
+        stats_key = self._get_key(spider)
+        field = (stats_key, key)
+        # The new value supersedes updates buffered before it.
+        if field in self._inc_buf:
+            del self._inc_buf[field]
+            self._inc_start.pop(field, None)
+        self._max_buf.pop(field, None)
+        self._min_buf.pop(field, None)
+        self._set_buf[stats_key][key] = value
+        self._maybe_flush()
 
     def set_stats(self, stats, spider=None):
         """Set all the hash stats"""
-        self.server.hmset(self._get_key(spider), stats)
+        self.flush()
+        self._submit(self._write_stats, self._get_key(spider), list(stats.items()))
+
+    def _write_stats(self, stats_key, items):
+        # Bounded HSETs keep each command, and the time redis spends on it,
+        # small while the pipeline still sends them in one round-trip.
+        pipe = self.server.pipeline(transaction=False)
+        for i in range(0, len(items), SET_STATS_CHUNK_SIZE):
+            pipe.hset(stats_key, mapping=dict(items[i:i + SET_STATS_CHUNK_SIZE]))
+        pipe.execute()
 
     def inc_value(self, key, count=1, start=0, spider=None):
         """Set increment of value according to key"""
-        if not self.server.hexists(self._get_key(spider), key):
-            self.set_value(key, start)
-        self.server.hincrby(self._get_key(spider), key, count)
+        self._buffer_inc(self._get_key(spider), key, count, start)
+        self._maybe_flush()
+
+    def inc_values(self, counts, spider=None):
+        """Increment several counters at once"""
+        stats_key = self._get_key(spider)
+        for key, count in counts.items():
+            self._buffer_inc(stats_key, key, count)
+        self._maybe_flush()
+
+    def _buffer_inc(self, stats_key, key, count, start=0):
+        values = self._set_buf.get(stats_key)
+        if values is not None and key in values:
+            # Applied on top of a value that is not written yet.
+            values[key] += count
+            return
+        field = (stats_key, key)
+        if field in self._max_buf or field in self._min_buf:
+            # Extremes are written after increments, keep them in order.
+            self.flush()
+        self._inc_buf[field] += count
+        if start:
+            self._inc_start.setdefault(field, start)
 
     def max_value(self, key, value, spider=None):
         """Set max value between current and new value"""
-        self.set_value(key, max(self.get_value(key, value), value))
+        self._buffer_extreme(self._max_buf, self._min_buf, operator.gt, key, value, spider)
 
     def min_value(self, key, value, spider=None):
         """Set min value between current and new value"""
-        self.set_value(key, min(self.get_value(key, value), value))
+        self._buffer_extreme(self._min_buf, self._max_buf, operator.lt, key, value, spider)
+
+    def _buffer_extreme(self, buf, other_buf, wins, key, value, spider):
+        """Keep in ``buf`` the new value if it ``wins`` over the pending one"""
+        if value.__class__ is datetime:
+            value = value.timestamp()
+        field = (self._get_key(spider), key)
+        if field in other_buf:
+            # Write the earlier extreme first, the scripts run max then min.
+            self.flush()
+        pending = buf.get(field)
+        if pending is None:
+            buf[field] = value
+            self._maybe_flush()
+        elif wins(value, pending):
+            buf[field] = value
+
+    def _maybe_flush(self):
+        pending = (
+            len(self._inc_buf)
+            + sum(map(len, self._set_buf.values()))
+            + len(self._max_buf)
+            + len(self._min_buf)
+        )
+        if pending >= self.flush_size:
+            self.flush()
+
+    def flush(self, wait=False):
+        """Write all buffered updates with a single pipeline
+
+        Increments are summed while buffered, so each distinct field gets a
+        single HINCRBY however many times it was incremented, and a single
+        script call however many times its maximum or minimum was set. The pipeline
+        runs in the writer thread; with ``wait`` this returns once every
+        update submitted so far has been written.
+        """
+        if self._inc_buf or self._set_buf or self._max_buf or self._min_buf:
+            batch = (
+                self._inc_buf, self._inc_start, self._set_buf, self._max_buf, self._min_buf
+            )
+            self._inc_buf = Counter()
+            self._inc_start = {}
+            self._set_buf = defaultdict(dict)
+            self._max_buf = {}
+            self._min_buf = {}
+            self._submit(self._write_updates, *batch)
+        if wait and self._writer is not None:
+            done = threading.Event()
+            self._submit(None, done=done)
+            done.wait()
+
+    def _write_updates(self, inc_buf, inc_start, set_buf, max_buf, min_buf):
+        pipe = self.server.pipeline(transaction=False)
+        for stats_key, values in set_buf.items():
+            pipe.hset(stats_key, mapping=values)
+        for field, count in inc_buf.items():
+            stats_key, key = field
+            start = inc_start.get(field)
+            if start is not None:
+                pipe.hsetnx(stats_key, key, start)
+            pipe.hincrby(stats_key, key, count)
+        for (stats_key, key), value in max_buf.items():
+            self._max_script(keys=[stats_key], args=[key, value], client=pipe)
+        for (stats_key, key), value in min_buf.items():
+            self._min_script(keys=[stats_key], args=[key, value], client=pipe)
+        pipe.execute()
+
+    def _submit(self, func, *args, done=None):
+        """Run ``func(*args)`` in the writer thread, after earlier writes"""
+        with self._writer_lock:
+            # Cancels any pending stop: the writer goes on past the marker.
+            self._stop_gen += 1
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="RedisStatsCollector", daemon=True
+                )
+                self._writer.start()
+            self._queue.put((func, args, done))
+
+    def _write_loop(self):
+        while True:
+            func, args, done = self._queue.get()
+            if func is None and done is None:
+                # Stop marker, only honored if nothing was submitted since.
+                with self._writer_lock:
+                    if args == (self._stop_gen,):
+                        self._writer = None
+                        return
+                continue
+            try:
+                if func is not None:
+                    func(*args)
+            except Exception:
+                logger.exception("Failed to write stats to redis")
+            finally:
+                if done is not None:
+                    done.set()
+
+    def _stop_writer(self):
+        """Flush, then stop the writer once it has written everything"""
+        self.flush()
+        with self._writer_lock:
+            writer = self._writer
+            if writer is None:
+                return
+            self._stop_gen += 1
+            self._queue.put((None, (self._stop_gen,), None))
+        # A writer still busy after the timeout keeps running and is reused
+        # by later submissions; it exits once it reaches the stop marker.
+        writer.join(timeout=5)
 
     def clear_stats(self, spider=None):
         """Clear all the hash stats"""
-        self.server.delete(self._get_key(spider))
+        stats_key = self._get_key(spider)
+        self._set_buf.pop(stats_key, None)
+        for pending in [pending for pending in self._inc_buf if pending[0] == stats_key]:
+            del self._inc_buf[pending]
+            self._inc_start.pop(pending, None)
+        for buf in (self._max_buf, self._min_buf):
+            for pending in [pending for pending in buf if pending[0] == stats_key]:
+                del buf[pending]
+        self._submit(self.server.delete, stats_key)
 
     def open_spider(self, spider):
         """Set spider to self"""
         if spider:
             self.spider = spider
+        # Open a pooled connection up front rather than on the first update.
+        self.server.ping()
+        # Keys are resolved once per spider name until the next spider opens.
+        self._resolve_key = build_key_resolver(
+            self.settings, self.stats_key, defaults.JOB_SCOPED_STATS_KEY
+        )
+        if self.flush_interval > 0 and self._flush_task is None:
+            self._flush_task = task.LoopingCall(self.flush)
+            self._flush_task.start(self.flush_interval, now=False)
 
     def close_spider(self, spider, reason):
         """Clear spider and clear stats"""
+        if self._flush_task is not None and self._flush_task.running:
+            self._flush_task.stop()
+        self._flush_task = None
+        self.flush()
         self.spider = None
         if not self.persist:
             self.clear_stats(spider)
+        self._stop_writer()
+
+
+class LocalCounters:
+    """Process-local counters applied to a stats collector in bulk.
+
+    Increments are summed in memory and applied on ``flush()``, which runs
+    every ``interval`` seconds once started, whenever ``max_pending``
+    increments are pending, and on ``stop()``. Collectors providing
+    ``inc_values`` receive all counters of a spider at once, which costs a
+    single round-trip.
+
+    Collectors whose updates are cheap or already buffered, namely Scrapy's
+    in-memory collectors and those setting ``buffers_writes`` such as
+    ``RedisStatsCollector``, gain nothing from a second layer that would only
+    delay the values: increments are passed straight through to them.
+    """
+
+    def __init__(self, stats, max_pending=1000):
+        self.stats = stats
+        self.max_pending = max_pending
+        self.passthrough = getattr(stats, "buffers_writes", False) or isinstance(
+            stats, (MemoryStatsCollector, DummyStatsCollector)
+        )
+        self._counts = defaultdict(int)
+        self._pending = 0
+        self._task = None
+
+    def inc(self, key, count=1, spider=None):
+        """Increment counter ``key`` by ``count``"""
+        if self.passthrough:
+            self.stats.inc_value(key, count, spider=spider)
+            return
+        self._counts[key, spider] += count
+        self._pending += 1
+        if self._pending >= self.max_pending:
+            self.flush()
+
+    def flush(self):
+        """Apply pending increments to the stats collector"""
+        counts, self._counts = self._counts, defaultdict(int)
+        self._pending = 0
+        by_spider = defaultdict(dict)
+        for (key, spider), count in counts.items():
+            by_spider[spider][key] = count
+        inc_values = getattr(self.stats, "inc_values", None)
+        for spider, spider_counts in by_spider.items():
+            if inc_values is not None:
+                inc_values(spider_counts, spider=spider)
+            else:
+                for key, count in spider_counts.items():
+                    self.stats.inc_value(key, count, spider=spider)
+
+    def start(self, interval):
+        """Flush periodically every ``interval`` seconds"""
+        if interval > 0 and self._task is None and not self.passthrough:
+            self._task = task.LoopingCall(self.flush)
+            self._task.start(interval, now=False)
+
+    def stop(self):
+        """Stop periodic flushing and flush pending increments"""
+        if self._task is not None and self._task.running:
+            self._task.stop()
+        self._task = None
+        self.flush()
@@ -1,8 +1,8 @@
-import json
 import os
-from json import JSONDecodeError
-
-import six
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Optional
 
 
 class TextColor:
@@ -17,42 +17,69 @@ class TextColor:
     UNDERLINE = "\033[4m"
 
 
+def paint(color, message):
+    """Return message wrapped in the given TextColor and a reset code."""
+    return "".join((color, message, TextColor.ENDC))
+
+
 def bytes_to_str(s, encoding="utf-8"):
     """Returns a str if a bytes object is given."""
-    if six.PY3 and isinstance(s, bytes):
+    if type(s) is bytes:
         return s.decode(encoding)
     return s
 
 
 def is_dict(string_content):
-    """Try load string_content as json, if failed, return False, else return True."""
-    try:
-        json.loads(string_content)
-    except JSONDecodeError:
-        return False
-    return True
+    """Return True if string_content looks like a JSON object.
+
+    Only the first non-whitespace character is inspected, the content is not
+    validated: callers still have to handle decoding errors.
+    """
+    if isinstance(string_content, (bytes, bytearray)):
+        return string_content.lstrip()[:1] == b"{"
+    if isinstance(string_content, str):
+        return string_content.lstrip()[:1] == "{"
+    return False
 
 
 def convert_bytes_to_str(data, encoding="utf-8"):
     """Convert a dict's keys & values from `bytes` to `str`
     or convert bytes to str"""
-    if isinstance(data, bytes):
+    if type(data) is bytes:
         return data.decode(encoding)
-    if isinstance(data, dict):
-        return dict(map(convert_bytes_to_str, data.items()))
-    elif isinstance(data, tuple):
-        return map(convert_bytes_to_str, data)
+    if type(data) is dict:
+        return {
+            (k.decode(encoding) if type(k) is bytes else k):
+            (v.decode(encoding) if type(v) is bytes else v)
+            for k, v in data.items()
+        }
     return data
 
 
+# Server versions per connection pool; a pool always talks to one server.
+_redis_versions = weakref.WeakKeyDictionary()
+
+
 def get_redis_version(server):
-    """Get Redis server version as tuple of integers."""
+    """Get Redis server version as tuple of integers.
+
+    The version is looked up once per connection pool.
+    """
+    try:
+        return _redis_versions[server.connection_pool]
+    except (KeyError, TypeError, AttributeError):
+        pass
     try:
-        info = server.info()
+        info = server.info(section='server')
         version_str = info['redis_version']
-        return tuple(int(x) for x in version_str.split('.'))
+        version = tuple(int(x) for x in version_str.split('.'))
     except Exception:
         return (0, 0, 0)
+    try:
+        _redis_versions[server.connection_pool] = version
+    except (TypeError, AttributeError):
+        pass
+    return version
 
 
 def supports_bzpopmin(server):
@@ -61,25 +88,41 @@ def supports_bzpopmin(server):
     return version >= (5, 0, 0)
 
 
+# Key expansion functions per template, see ``expand_key_template``.
+_TEMPLATE_CACHE = {}
+
+
+def _compile_key_template(template):
+    """Build a function expanding template with only the params it uses."""
+    needs_spider = '%(spider)' in template or '%(name)' in template
+    needs_job_id = '%(job_id)' in template
+    # Timestamp for legacy compatibility
+    needs_timestamp = '%(timestamp)' in template
+
+    def expand(spider_name, job_id):
+        params = {}
+        if needs_spider and spider_name:
+            params['spider'] = spider_name
+            params['name'] = spider_name  # backwards compatibility
+        if needs_job_id and job_id:
+            params['job_id'] = job_id
+        if needs_timestamp:
+            params['timestamp'] = int(time.time())
+        try:
+            return template % params
+        except KeyError:
+            # Missing required parameter, return template as-is
+            return template
+
+    return expand
+
+
 def expand_key_template(template, spider_name=None, job_id=None):
     """Expand key template with spider name and job_id if available."""
-    params = {}
-    
-    if spider_name:
-        params['spider'] = spider_name
-        params['name'] = spider_name  # backwards compatibility
-    
-    if job_id:
-        params['job_id'] = job_id
-    
-    # Add timestamp for legacy compatibility
-    params['timestamp'] = int(__import__('time').time())
-    
-    try:
-        return template % params
-    except KeyError:
-        # Missing required parameter, return template as-is
-        return template
+    expand = _TEMPLATE_CACHE.get(template)
+    if expand is None:
+        expand = _TEMPLATE_CACHE[template] = _compile_key_template(template)
+    return expand(spider_name, job_id)
 
 
 def get_job_id_from_settings(settings):
@@ -90,12 +133,65 @@ def get_job_id_from_settings(settings):
     return job_id
 
 
+@dataclass(frozen=True)
+class EffectiveKeyCfg:
+    """Settings deciding which key template a component uses."""
+
+    use_job_scoped: bool
+    job_id: Optional[str]
+
+    def template(self, legacy_key, job_scoped_key):
+        """Return the key template to expand."""
+        if self.use_job_scoped and self.job_id:
+            return job_scoped_key
+        return legacy_key
+
+
+# Resolved configs of frozen settings, by id; entries are dropped along with
+# their settings object so ids are never reused.
+_key_cfgs = {}
+
+
+def resolve_key_cfg(settings):
+    """Return the ``EffectiveKeyCfg`` of settings.
+
+    Frozen settings cannot change anymore, so their config is resolved once.
+    """
+    cfg = _key_cfgs.get(id(settings))
+    if cfg is None:
+        cfg = EffectiveKeyCfg(
+            use_job_scoped=settings.getbool('USE_JOB_SCOPED_KEYS', False),
+            job_id=get_job_id_from_settings(settings),
+        )
+        if getattr(settings, 'frozen', False):
+            _key_cfgs[id(settings)] = cfg
+            weakref.finalize(settings, _key_cfgs.pop, id(settings), None)
+    return cfg
+
+
 def get_effective_key(settings, legacy_key, job_scoped_key, spider_name=None):
     """Get the effective key based on whether job-scoped keys are enabled."""
-    use_job_scoped = settings.getbool('USE_JOB_SCOPED_KEYS', False)
-    job_id = get_job_id_from_settings(settings)
-    
-    if use_job_scoped and job_id:
-        return expand_key_template(job_scoped_key, spider_name, job_id)
-    else:
-        return expand_key_template(legacy_key, spider_name, job_id)
+    cfg = resolve_key_cfg(settings)
+    template = cfg.template(legacy_key, job_scoped_key)
+    return expand_key_template(template, spider_name, cfg.job_id)
+
+
+def build_key_resolver(settings, legacy_key, job_scoped_key):
+    """Build a function returning the effective key for a spider name.
+
+    This is ``get_effective_key`` specialized for fixed settings: the settings
+    and the job id are read once, and each spider's key is formatted on first
+    use only.
+    """
+    cfg = resolve_key_cfg(settings)
+    template = cfg.template(legacy_key, job_scoped_key)
+    job_id = cfg.job_id
+    keys = {}
+
+    def resolve_key(spider_name=None):
+        key = keys.get(spider_name)
+        if key is None:
+            key = keys[spider_name] = expand_key_template(template, spider_name, job_id)
+        return key
+
+    return resolve_key
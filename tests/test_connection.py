@@ -1,5 +1,7 @@
 from unittest import mock
 
+import redis
+
 from scrapy.settings import Settings
 
 from scrapy_redis import defaults
@@ -44,6 +46,18 @@ class TestFromSettings:
         server = from_settings(Settings())
         assert isinstance(server, defaults.REDIS_CLS)
 
+    def test_shared_connection_pool(self):
+        settings = Settings({"REDIS_PORT": 9001})
+        server = from_settings(settings)
+        assert from_settings(settings).connection_pool is server.connection_pool
+        other = from_settings(Settings({"REDIS_PORT": 9002}))
+        assert other.connection_pool is not server.connection_pool
+
+    def test_blocking_connection_pool(self):
+        server = from_settings(Settings({"REDIS_PORT": 9003, "REDIS_POOL_SIZE": "8"}))
+        assert isinstance(server.connection_pool, redis.BlockingConnectionPool)
+        assert server.connection_pool.max_connections == 8
+
     def test_redis_cls_custom_path(self):
         self.settings["REDIS_PARAMS"]["redis_cls"] = "unittest.mock.Mock"
         server = from_settings(self.settings)
@@ -106,3 +106,10 @@ class TestFromMethods:
         assert df.server is get_redis_from_settings.return_value
         assert df.key.startswith("dupefilter:")
         assert df.debug  # true
+        # Fingerprints never expire unless DUPEFILTER_TTL_SECONDS is set.
+        assert df.ttl_ms == 0
+
+    def test_from_settings_ttl(self, get_redis_from_settings):
+        self.settings["DUPEFILTER_TTL_SECONDS"] = 60
+        df = RFPDupeFilter.from_settings(self.settings)
+        assert df.ttl_ms == 60000
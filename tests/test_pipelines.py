@@ -0,0 +1,136 @@
+import json
+import math
+from unittest import mock
+
+import pytest
+from scrapy import Spider
+from twisted.internet import defer, task
+
+from scrapy_redis.pipelines import (
+    HAS_ORJSON,
+    RedisPipeline,
+    default_serialize,
+    orjson_serialize,
+)
+
+
+def test_default_serialize_matches_scrapy_encoder():
+    assert json.loads(default_serialize({"n": 2**70})) == {"n": 2**70}
+    assert math.isnan(json.loads(default_serialize({"n": float("nan")}))["n"])
+    assert json.loads(default_serialize({"n": None, "s": "foo"})) == {"n": None, "s": "foo"}
+
+
+@pytest.mark.skipif(not HAS_ORJSON, reason="orjson is not installed")
+def test_orjson_serialize_returns_bytes():
+    item = {"n": 1, "s": "foo", "tags": {"a"}}
+    data = orjson_serialize(item)
+    assert isinstance(data, bytes)
+    assert json.loads(data) == json.loads(default_serialize(item))
+    assert json.loads(orjson_serialize({"n": 2**70})) == {"n": 2**70}
+    assert json.loads(orjson_serialize({"n": None})) == {"n": None}
+
+
+def push_in_reactor_thread(func, *args):
+    return defer.maybeDeferred(func, *args)
+
+
+@pytest.fixture
+def pipeline():
+    server = mock.Mock()
+    with mock.patch("scrapy_redis.pipelines.deferToThread", push_in_reactor_thread):
+        yield RedisPipeline(server, serialize_func=str, batch_size=3, flush_interval=1.0)
+
+
+@pytest.fixture
+def clock():
+    clock = task.Clock()
+    looping_call = task.LoopingCall
+
+    def clocked_looping_call(*args):
+        call = looping_call(*args)
+        call.clock = clock
+        return call
+
+    with mock.patch("twisted.internet.task.LoopingCall", clocked_looping_call):
+        yield clock
+
+
+def test_flush_on_batch_size(pipeline):
+    spider = Spider("foo")
+    assert pipeline.process_item("a", spider) == "a"
+    assert pipeline.process_item("b", spider) == "b"
+    pipeline.server.rpush.assert_not_called()
+
+    results = []
+    pipeline.process_item("c", spider).addCallback(results.append)
+    pipeline.server.rpush.assert_called_once_with("foo:items", "a", "b", "c")
+    assert results == ["c"]
+
+
+def test_items_are_serialized_when_buffered(pipeline):
+    spider = Spider("foo")
+    item = {"a": 1}
+    pipeline.process_item(item, spider)
+    item["a"] = 2
+    pipeline.flush()
+    pipeline.server.rpush.assert_called_once_with("foo:items", "{'a': 1}")
+
+
+def test_unserializable_item_is_not_buffered(pipeline):
+    def serialize(item):
+        if item == "bad":
+            raise ValueError(item)
+        return item
+
+    spider = Spider("foo")
+    pipeline.serialize = serialize
+    pipeline.process_item("foo", spider)
+    with pytest.raises(ValueError):
+        pipeline.process_item("bad", spider)
+    pipeline.process_item("bar", spider)
+    pipeline.flush()
+    pipeline.server.rpush.assert_called_once_with("foo:items", "foo", "bar")
+
+
+def test_periodic_flush(pipeline, clock):
+    spider = Spider("foo")
+    pipeline.open_spider(spider)
+    pipeline.process_item("a", spider)
+    clock.advance(1)
+    pipeline.server.rpush.assert_called_once_with("foo:items", "a")
+
+    # A failed push is kept and retried without stopping the periodic flush.
+    pipeline.server.rpush.side_effect = ConnectionError
+    pipeline.process_item("b", spider)
+    clock.advance(1)
+    pipeline.server.rpush.side_effect = None
+    pipeline.process_item("c", spider)
+    clock.advance(1)
+    pipeline.server.rpush.assert_called_with("foo:items", "b", "c")
+    pipeline.close_spider(spider)
+
+
+def test_flush_on_close_spider(pipeline, clock):
+    spider = Spider("foo")
+    pipeline.open_spider(spider)
+    pipeline.process_item("a", spider)
+    pipeline.process_item("b", spider)
+    pipeline.close_spider(spider)
+    pipeline.server.rpush.assert_called_once_with("foo:items", "a", "b")
+    assert not clock.getDelayedCalls()
+
+
+def test_pushes_to_a_key_run_in_order(pipeline):
+    spider = Spider("foo")
+    pushes = []
+    pipeline._push_batch = lambda key, batch: pushes.append(batch)
+    running = defer.Deferred()
+    with mock.patch("scrapy_redis.pipelines.deferToThread", lambda func, *args: running):
+        pipeline.process_item("a", spider)
+        first = pipeline.flush()
+    pipeline.process_item("b", spider)
+    second = pipeline.flush()
+    assert pushes == []
+    running.callback(None)
+    assert pushes == [["b"]]
+    assert first.called and second.called
@@ -10,6 +10,7 @@ from scrapy_redis import connection
 from scrapy_redis.dupefilter import RFPDupeFilter
 from scrapy_redis.queue import FifoQueue, LifoQueue, PriorityQueue
 from scrapy_redis.scheduler import Scheduler
+from scrapy_redis.stats import RedisStatsCollector
 
 # allow test settings from environment
 REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
@@ -55,6 +56,14 @@ class DupeFilterTest(RedisTestMixin, TestCase):
 
         self.df.close("nothing")
 
+    def test_dupe_filter_ttl(self):
+        df = RFPDupeFilter(self.server, self.key, ttl=60)
+        req = Request("http://example.com")
+
+        self.assertFalse(df.request_seen(req))
+        self.assertTrue(df.request_seen(req))
+        self.assertTrue(0 < self.server.pttl(self.key) <= 60000)
+
 
 class QueueTestMixin(RedisTestMixin):
 
@@ -86,6 +95,17 @@ class QueueTestMixin(RedisTestMixin):
         self.q.clear()
         self.assertEqual(len(self.q), 0)
 
+    def test_push_front(self):
+        for i in range(4):
+            self.q.push(Request(f"http://example.com/?page={i}"))
+        popped = self.q.pop_batch(2)
+
+        # Given back requests are popped again before the others, in order.
+        self.q.push_front(popped)
+        self.assertEqual(
+            [self.q.pop().url for _ in range(2)], [req.url for req in popped]
+        )
+
 
 class FifoQueueTest(QueueTestMixin, TestCase):
 
@@ -193,6 +213,43 @@ class SchedulerTest(RedisTestMixin, TestCase):
 
         self.scheduler.close("finish")
 
+    def test_enqueue_requests(self):
+        self.scheduler.open(self.spider)
+        self.assertIsNotNone(self.scheduler._enqueue_script)
+        seen = Request("http://example.com/seen")
+        self.scheduler.enqueue_request(seen)
+
+        requests = [
+            Request("http://example.com/new"),
+            seen,
+            Request("http://example.com/new"),
+            Request("http://example.com/seen", dont_filter=True),
+        ]
+        self.assertEqual(
+            self.scheduler.enqueue_requests(requests), [True, False, False, True]
+        )
+        self.assertEqual(len(self.scheduler), 3)
+        urls = sorted(self.scheduler.next_request().url for _ in range(3))
+        self.assertEqual(
+            urls,
+            [
+                "http://example.com/new",
+                "http://example.com/seen",
+                "http://example.com/seen",
+            ],
+        )
+
+        self.scheduler.close("finish")
+
+    def test_close_hooks_run_before_flush(self):
+        self.scheduler.open(self.spider)
+        req = Request("http://example.com/retry")
+        self.scheduler.add_close_hook(lambda: self.scheduler.enqueue_request(req))
+        self.scheduler.close("finish")
+
+        self.assertEqual(len(self.scheduler.queue), 0)
+        self.assertEqual(self.server.keys(self.key_prefix + "*"), [])
+
     def test_scheduler_persistent(self):
         # TODO: Improve this test to avoid the need to check for log messages.
         self.spider.log = mock.Mock(spec=self.spider.log)
@@ -221,6 +278,64 @@ class SchedulerTest(RedisTestMixin, TestCase):
 
         self.assertEqual(len(self.scheduler), 0)
 
+    def test_scheduler_persistent_prefetched(self):
+        self.scheduler.persist = True
+        self.scheduler.open(self.spider)
+
+        for i in range(3):
+            self.scheduler.enqueue_request(Request(f"http://example.com/page{i}"))
+
+        self.assertIsNotNone(self.scheduler.next_request())
+        self.assertEqual(len(self.scheduler.queue), 0)
+        self.assertEqual(len(self.scheduler), 2)
+        self.scheduler.close("finish")
+
+        # Prefetched requests are given back to redis on close.
+        self.scheduler.open(self.spider)
+        self.assertEqual(len(self.scheduler.queue), 2)
+
+        self.scheduler.persist = False
+        self.scheduler.close("finish")
+
+
+class StatsSpider(Spider):
+    name = "statsspider"
+
+
+class StatsCollectorTest(RedisTestMixin, TestCase):
+
+    def setUp(self):
+        self.key_prefix = "scrapy_redis:tests:"
+        crawler = get_crawler(
+            StatsSpider,
+            {
+                "REDIS_HOST": REDIS_HOST,
+                "REDIS_PORT": REDIS_PORT,
+                "STATS_KEY": self.key_prefix + "%(spider)s:stats",
+            },
+        )
+        self.stats = RedisStatsCollector(crawler)
+
+    def tearDown(self):
+        self.stats._stop_writer()
+        self.clear_keys(self.key_prefix)
+
+    def test_max_value(self):
+        self.stats.max_value("max", 5)
+        self.assertEqual(self.stats.get_value("max"), 5)
+        self.stats.max_value("max", 3)
+        self.assertEqual(self.stats.get_value("max"), 5)
+        self.stats.max_value("max", 8)
+        self.assertEqual(self.stats.get_value("max"), 8)
+
+    def test_min_value(self):
+        self.stats.min_value("min", 5)
+        self.assertEqual(self.stats.get_value("min"), 5)
+        self.stats.min_value("min", 8)
+        self.assertEqual(self.stats.get_value("min"), 5)
+        self.stats.min_value("min", 3)
+        self.assertEqual(self.stats.get_value("min"), 3)
+
 
 class ConnectionTest(TestCase):
 
@@ -0,0 +1,59 @@
+import pytest
+
+from scrapy_redis import serializers
+from scrapy_redis.serializers import get_default_serializer, get_serializer
+
+OBJ = {
+    "body": b"foo=bar",
+    "callback": "parse",
+    "headers": {"Referer": ["http://www.dmoz.org/"]},
+    "meta": {"depth": 1, "link_text": "Fran\xe7ais"},
+    "method": "POST",
+    "priority": 0,
+    "url": "http://www.dmoz.org/World/Fran%C3%A7ais/",
+}
+
+
+@pytest.mark.parametrize("name", ["msgpack", "msgpack-legacy"])
+def test_msgpack_roundtrip(name):
+    if name == "msgpack-legacy" or not serializers.HAS_MSGSPEC:
+        pytest.importorskip("msgpack")
+    serializer = get_serializer(name)
+    data = serializer.dumps(OBJ)
+    assert isinstance(data, bytes)
+    assert serializer.loads(data) == OBJ
+
+
+def test_msgpack_wire_compatible():
+    pytest.importorskip("msgspec")
+    pytest.importorskip("msgpack")
+    new, legacy = get_serializer("msgpack"), get_serializer("msgpack-legacy")
+    assert legacy.loads(new.dumps(OBJ)) == OBJ
+    assert new.loads(legacy.dumps(OBJ)) == OBJ
+
+
+def test_default_serializer():
+    assert isinstance(get_default_serializer(), serializers.SERIALIZERS["msgpack"])
+    assert isinstance(
+        get_default_serializer(force_legacy=True), serializers.JsonSerializer
+    )
+
+
+def test_default_serializer_requires_msgpack(monkeypatch):
+    monkeypatch.setattr(serializers, "HAS_MSGSPEC", False)
+    monkeypatch.setattr(serializers, "HAS_MSGPACK", False)
+    monkeypatch.setitem(serializers.SERIALIZERS, "msgpack", serializers.MsgpackSerializer)
+    with pytest.raises(ImportError):
+        get_default_serializer()
+
+
+def test_json_roundtrip():
+    serializer = get_serializer("json")
+    obj = dict(OBJ, body="foo=bar", meta={"link_text": "Fran\xe7ais", 2: "two"})
+    data = serializer.dumps(obj)
+    assert isinstance(data, bytes)
+    assert "Fran\xe7ais".encode("utf-8") in data
+    assert serializer.loads(data) == dict(
+        obj, meta={"link_text": "Fran\xe7ais", "2": "two"}
+    )
+    assert serializer.loads(data.decode("utf-8")) == serializer.loads(data)
@@ -0,0 +1,158 @@
+import threading
+from unittest import mock
+
+from scrapy import Spider
+from scrapy.statscollectors import MemoryStatsCollector
+from scrapy.utils.test import get_crawler
+
+from scrapy_redis.stats import LocalCounters, RedisStatsCollector
+
+
+class StatsSpider(Spider):
+    name = "stats"
+
+
+def get_stats_collector():
+    with mock.patch("scrapy_redis.stats.redis_from_settings") as from_settings:
+        stats = RedisStatsCollector(get_crawler(StatsSpider))
+    return stats, from_settings.return_value.pipeline.return_value
+
+
+def test_inc_value_aggregates_increments():
+    stats, pipe = get_stats_collector()
+    for _ in range(10000):
+        stats.inc_value("downloader/request_count")
+    stats.flush(wait=True)
+
+    pipe.hincrby.assert_called_once_with("stats:stats", "downloader/request_count", 10000)
+    pipe.execute.assert_called_once_with()
+
+
+def test_set_value_overrides_buffered_increments():
+    stats, pipe = get_stats_collector()
+    stats.inc_value("item_scraped_count", 5)
+    stats.set_value("item_scraped_count", 1)
+    stats.inc_value("item_scraped_count", 2)
+    stats.flush(wait=True)
+
+    pipe.hset.assert_called_once_with("stats:stats", mapping={"item_scraped_count": 3})
+    pipe.hincrby.assert_not_called()
+
+
+def test_inc_value_initializes_start_with_hsetnx():
+    stats, pipe = get_stats_collector()
+    stats.inc_value("retry/count", 1, start=10)
+    stats.flush(wait=True)
+
+    pipe.hsetnx.assert_called_once_with("stats:stats", "retry/count", 10)
+    pipe.hincrby.assert_called_once_with("stats:stats", "retry/count", 1)
+    stats.server.hexists.assert_not_called()
+
+
+def test_max_value_keeps_pending_extreme():
+    stats, pipe = get_stats_collector()
+    for depth in [3, 7, 1] * 1000:
+        stats.max_value("request_depth_max", depth)
+        stats.min_value("request_depth_min", depth)
+    stats.flush(wait=True)
+
+    # Both scripts are the same mock, registered on the mocked server.
+    assert stats._max_script.call_args_list == [
+        mock.call(keys=["stats:stats"], args=["request_depth_max", 7], client=pipe),
+        mock.call(keys=["stats:stats"], args=["request_depth_min", 1], client=pipe),
+    ]
+    pipe.execute.assert_called_once_with()
+
+
+def test_set_value_overrides_pending_extreme():
+    stats, pipe = get_stats_collector()
+    stats.max_value("depth", 7)
+    stats.set_value("depth", 2)
+    stats.flush(wait=True)
+
+    pipe.hset.assert_called_once_with("stats:stats", mapping={"depth": 2})
+    stats._max_script.assert_not_called()
+
+
+def test_single_writer_after_stop_timeout():
+    stats, pipe = get_stats_collector()
+    release = threading.Event()
+    pipe.execute.side_effect = lambda: release.wait()
+    stats.inc_value("a")
+    with mock.patch.object(threading.Thread, "join"):
+        stats._stop_writer()
+    writer = stats._writer
+    assert writer.is_alive()
+
+    # Submitting while the stopping writer drains reuses it.
+    stats.inc_value("b")
+    stats.flush()
+    assert stats._writer is writer
+    release.set()
+    stats.flush(wait=True)
+    assert pipe.execute.call_count == 2
+
+    stats._stop_writer()
+    assert stats._writer is None
+    assert not writer.is_alive()
+
+
+class CountingStats:
+    """Write-through collector recording the updates it receives."""
+
+    def __init__(self):
+        self.calls = []
+
+    def inc_value(self, key, count=1, start=0, spider=None):
+        self.calls.append(("inc_value", key, count, spider))
+
+
+class BatchCountingStats(CountingStats):
+
+    def inc_values(self, counts, spider=None):
+        self.calls.append(("inc_values", counts, spider))
+
+
+def test_local_counters_flush_on_max_pending():
+    stats = CountingStats()
+    counters = LocalCounters(stats, max_pending=3)
+    counters.inc("a")
+    counters.inc("a")
+    assert stats.calls == []
+    counters.inc("b", 5)
+    assert stats.calls == [("inc_value", "a", 2, None), ("inc_value", "b", 5, None)]
+
+
+def test_local_counters_stop_flushes():
+    stats = CountingStats()
+    counters = LocalCounters(stats)
+    counters.inc("a", spider="foo")
+    counters.stop()
+    assert stats.calls == [("inc_value", "a", 1, "foo")]
+    counters.stop()
+    assert len(stats.calls) == 1
+
+
+def test_local_counters_use_inc_values():
+    stats = BatchCountingStats()
+    counters = LocalCounters(stats)
+    counters.inc("a", spider="foo")
+    counters.inc("b", spider="foo")
+    counters.inc("a", spider="bar")
+    counters.flush()
+    assert stats.calls == [
+        ("inc_values", {"a": 1, "b": 1}, "foo"),
+        ("inc_values", {"a": 1}, "bar"),
+    ]
+
+
+def test_local_counters_pass_through_to_buffering_collectors():
+    stats, _ = get_stats_collector()
+    counters = LocalCounters(stats)
+    counters.inc("a", 2)
+    assert stats._inc_buf[("stats:stats", "a")] == 2
+
+    memory_stats = MemoryStatsCollector(get_crawler(StatsSpider))
+    counters = LocalCounters(memory_stats)
+    counters.inc("a", 2)
+    assert memory_stats.get_value("a") == 2
@@ -1,7 +1,61 @@
-from scrapy_redis.utils import bytes_to_str
+from unittest import mock
+
+from scrapy.settings import Settings
+
+from scrapy_redis.utils import (
+    build_key_resolver,
+    bytes_to_str,
+    convert_bytes_to_str,
+    get_redis_version,
+    is_dict,
+    resolve_key_cfg,
+)
 
 
 def test_bytes_to_str():
     assert bytes_to_str(b"foo") == "foo"
     # This char is the same in bytes or latin1.
     assert bytes_to_str(b"\xc1", "latin1") == "\xc1"
+
+
+def test_convert_bytes_to_str():
+    assert convert_bytes_to_str(b"foo") == "foo"
+    assert convert_bytes_to_str({b"foo": b"1", "bar": 2}) == {"foo": "1", "bar": 2}
+    # Other containers are returned unchanged rather than as lazy iterators.
+    assert convert_bytes_to_str((b"foo", b"bar")) == (b"foo", b"bar")
+
+
+def test_is_dict():
+    assert is_dict('{"url": "http://example.com"}')
+    assert is_dict(b'  {"url": "http://example.com"}')
+    assert not is_dict("http://example.com")
+    assert not is_dict("")
+    assert not is_dict(None)
+
+
+def test_get_redis_version_cached():
+    server = mock.Mock()
+    server.info.return_value = {"redis_version": "7.2.4"}
+    assert get_redis_version(server) == (7, 2, 4)
+    assert get_redis_version(server) == (7, 2, 4)
+    server.info.assert_called_once_with(section="server")
+
+
+def test_build_key_resolver():
+    resolve = build_key_resolver(Settings(), "%(spider)s:items", "%(job_id)s:%(spider)s:items")
+    assert resolve("foo") == "foo:items"
+    assert resolve("bar") == "bar:items"
+
+    settings = Settings({"USE_JOB_SCOPED_KEYS": True, "JOB_ID": "job1"})
+    resolve = build_key_resolver(settings, "%(spider)s:items", "%(job_id)s:%(spider)s:items")
+    assert resolve("foo") == "job1:foo:items"
+
+
+def test_resolve_key_cfg():
+    settings = Settings({"USE_JOB_SCOPED_KEYS": True, "JOB_ID": "job1"})
+    cfg = resolve_key_cfg(settings)
+    assert cfg.use_job_scoped and cfg.job_id == "job1"
+    assert cfg.template("legacy", "scoped") == "scoped"
+
+    settings.freeze()
+    assert resolve_key_cfg(settings) is resolve_key_cfg(settings)